@@ -42,6 +42,7 @@ class CoordCube:
      flipslice coordinate X and:
      flipslicesorted_sym[X] gives the symmetry 0 <= sym < 16 such that X = sym^-1*rep*sym, where rep is the representant
      of the class given by clsidx.
+     Both are stored in one entry flipslicesorted_classsym[X] = (clsidx << 4) | sym, so one lookup gives both.
      We choose the representant to be the element with the smallest flipslicesorted coordinate in the equivalence class.
 
      The pruning table then has 1523864*3^7*35 entries and holds the information about the *shortest* distance of any
@@ -77,6 +78,9 @@ class CoordCube:
             self.FB_phasex24x35_depth = 0
 
             self.corner_depth = 0
+            self.cornertwist_depth = 0
+            self.edges6 = SOLVED  # positions and orientations of the edges UR, UF, UL, UB, DR and DF
+            self.edge_depth = 0
         else:
 
             self.corners = cc.get_corners()
@@ -109,6 +113,10 @@ class CoordCube:
             self.FB_phasex24x35_depth = self.get_phasex24x35_depth(2)
 
             self.corner_depth = pr.corner_depth[self.corners]  # for corners we store just the depth
+            self.cornertwist_depth = self.get_cornertwist_depth()
+
+            self.edges6 = cc.get_edges6()
+            self.edge_depth = 0 if pr.edge_depth is None else pr.edge_depth[self.edges6]
 
     def __str__(self):
         s = '(UD_twist: ' + str(self.UD_twist) + ', UD_flip: ' + str(self.UD_flip) + ', UD_slice_sorted: ' + str(
@@ -134,6 +142,8 @@ class CoordCube:
         :param m: Move to be applied
         """
         self.corners = mv.corners_move[N_MOVE * self.corners + m]
+        if mv.edges6_move is not None:
+            self.edges6 = mv.edges6_move[N_MOVE * (self.edges6 >> 6) + m] ^ (self.edges6 & 63)
 
         self.UD_twist = mv.twist_move[N_MOVE * self.UD_twist + m]
         self.UD_flip = mv.flip_move[N_MOVE * self.UD_flip + m]
@@ -160,6 +170,18 @@ class CoordCube:
         self.FB_phasex24x35_depth = self.get_phasex24x35_depth(2)
 
         self.corner_depth = pr.corner_depth[self.corners]  # for corners we store just the depth
+        self.cornertwist_depth = self.get_cornertwist_depth()
+
+        self.edge_depth = 0 if pr.edge_depth is None else pr.edge_depth[self.edges6]
+
+    def get_cornertwist_depth(self):
+        """
+        Compute the distance of the corner permutation and twist to the solved corners, 0 without the cornertwist
+        pruning table
+        """
+        if pr.cornertwist_depth3 is None:
+            return 0
+        return cornertwist_depth(self.corners, self.UD_twist)
 
     def get_phasex24x35_depth(self, position):
         """
@@ -167,47 +189,65 @@ class CoordCube:
         :param position:
         :return:
         """
-        # find initial distance from given position
         if position == 0:
-            slicesorted = self.UD_slice_sorted
-            flip = self.UD_flip
-            twist = self.UD_twist
-            corners = self.UD_corners
+            return phasex24x35_depth(self.UD_slice_sorted, self.UD_flip, self.UD_twist, self.UD_corners)
         elif position == 1:
-            slicesorted = self.RL_slice_sorted
-            flip = self.RL_flip
-            twist = self.RL_twist
-            corners = self.RL_corners
+            return phasex24x35_depth(self.RL_slice_sorted, self.RL_flip, self.RL_twist, self.RL_corners)
         else:
-            slicesorted = self.FB_slice_sorted
-            flip = self.FB_flip
-            twist = self.FB_twist
-            corners = self.FB_corners
-        flipslicesorted = N_FLIP * slicesorted + flip
-        classidx = sy.flipslicesorted_classidx[flipslicesorted]
-        sym = sy.flipslicesorted_sym[flipslicesorted]
-        depth_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(corners << 4) + sym],
-                                         N_TWIST * classidx + sy.twist_conj[(twist << 4) + sym])
-
-        depth = 0
-        while flip != SOLVED or slicesorted != SOLVED or twist != SOLVED or corners != SOLVED:
-            if depth_mod3 == 0:
-                depth_mod3 = 3
-            for m in Move:  # we can use the same m in all 3 rotational positions
-                twist1 = mv.twist_move[N_MOVE * twist + m]
-                corners1 = mv.udcorners_move[N_MOVE * corners + m]
-                flip1 = mv.flip_move[N_MOVE * flip + m]
-                slicesorted1 = mv.slice_sorted_move[N_MOVE * slicesorted + m]
-                flipslicesorted1 = N_FLIP * slicesorted1 + flip1
-                classidx1 = sy.flipslicesorted_classidx[flipslicesorted1]
-                sym = sy.flipslicesorted_sym[flipslicesorted1]
-                if pr.get_fsstc_depth3(sy.udcorners_conj[(corners1 << 4) + sym],
-                                       N_TWIST * classidx1 + sy.twist_conj[(twist1 << 4) + sym]) == depth_mod3 - 1:
-                    depth += 1
-                    twist = twist1
-                    corners = corners1
-                    flip = flip1
-                    slicesorted = slicesorted1
-                    depth_mod3 -= 1
-                    break
-        return depth
+            return phasex24x35_depth(self.FB_slice_sorted, self.FB_flip, self.FB_twist, self.FB_corners)
+
+
+def cornertwist_depth(corners, twist):
+    """Distance of the corner permutation and twist to the solved corners with the cornertwist pruning table."""
+    depth_mod3 = pr.get_cornertwist_depth3(corners, twist)
+    depth = 0
+    while corners != SOLVED or twist != SOLVED:
+        if depth_mod3 == 0:
+            depth_mod3 = 3
+        for m in Move:
+            corners1 = mv.corners_move[N_MOVE * corners + m]
+            twist1 = mv.twist_move[N_MOVE * twist + m]
+            if pr.get_cornertwist_depth3(corners1, twist1) == depth_mod3 - 1:
+                depth += 1
+                corners = corners1
+                twist = twist1
+                depth_mod3 -= 1
+                break
+    return depth
+
+
+def phasex24x35_depth(slicesorted, flip, twist, corners, limit=None):
+    """Distance of the coordinates to the cube subgroup where flip=slicesorted=twist==udcorners=0. The walk down to the
+    subgroup stops after limit moves, then limit is returned and the distance is limit or more."""
+    flipslicesorted = N_FLIP * slicesorted + flip
+    classsym = sy.flipslicesorted_classsym[flipslicesorted]
+    classidx = classsym >> 4
+    sym = classsym & 15
+    depth_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(corners << 4) + sym],
+                                     N_TWIST * classidx + sy.twist_conj[(twist << 4) + sym])
+
+    depth = 0
+    while flip != SOLVED or slicesorted != SOLVED or twist != SOLVED or corners != SOLVED:
+        if depth == limit:
+            break
+        if depth_mod3 == 0:
+            depth_mod3 = 3
+        for m in Move:  # we can use the same m in all 3 rotational positions
+            twist1 = mv.twist_move[N_MOVE * twist + m]
+            corners1 = mv.udcorners_move[N_MOVE * corners + m]
+            flip1 = mv.flip_move[N_MOVE * flip + m]
+            slicesorted1 = mv.slice_sorted_move[N_MOVE * slicesorted + m]
+            flipslicesorted1 = N_FLIP * slicesorted1 + flip1
+            classsym1 = sy.flipslicesorted_classsym[flipslicesorted1]
+            classidx1 = classsym1 >> 4
+            sym = classsym1 & 15
+            if pr.get_fsstc_depth3(sy.udcorners_conj[(corners1 << 4) + sym],
+                                   N_TWIST * classidx1 + sy.twist_conj[(twist1 << 4) + sym]) == depth_mod3 - 1:
+                depth += 1
+                twist = twist1
+                corners = corners1
+                flip = flip1
+                slicesorted = slicesorted1
+                depth_mod3 -= 1
+                break
+    return depth
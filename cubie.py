@@ -2,7 +2,6 @@
 
 from defs import cornerFacelet, edgeFacelet, cornerColor, edgeColor, N_SYM
 from enums import Color, Corner as Co, Edge as Ed, Move
-import face
 from misc import c_nk, rotate_left, rotate_right
 from random import randrange
 
@@ -100,7 +99,8 @@ class CubieCube:
 
     def to_facelet_cube(self):
         """Return a facelet representation of the cube."""
-        fc = face.FaceCube()
+        from face import FaceCube  # here and not at the top, face imports cubie
+        fc = FaceCube()
         for i in Co:
             j = self.cp[i]  # corner j is at corner position i
             ori = self.co[i]  # orientation of C j at position i
@@ -365,6 +365,43 @@ class CubieCube:
                 self.ep[j] = other_edge[x]
                 x += 1
 
+    def get_edges6(self):
+        """Get the positions and orientations of the six edges UR, UF, UL, UB, DR and DF.
+            0 <= edges6 < 12*11*10*9*8*7*2^6, edges6 = 0 for solved cube. The orientations are the lowest 6 bits."""
+        pos = [0] * 6
+        ori = 0
+        for j in Ed:
+            if self.ep[j] <= Ed.DF:
+                pos[self.ep[j]] = j
+                ori |= self.eo[j] << self.ep[j]
+        free = list(range(12))
+        a = 0
+        for k in range(6):  # the position of the k-th edge among the positions not taken by the edges before
+            r = free.index(pos[k])
+            a = (12 - k) * a + r
+            free.pop(r)
+        return (a << 6) | ori
+
+    def set_edges6(self, idx):
+        """Set the six edges UR..DF, the other edges fill the remaining positions in the order DL, DB, FR, FL, BL, BR
+        with orientation 0."""
+        a = idx >> 6
+        r = [0] * 6
+        for k in range(5, -1, -1):
+            r[k] = a % (12 - k)
+            a //= 12 - k
+        free = list(range(12))
+        self.ep = [-1] * 12
+        self.eo = [0] * 12
+        for k in range(6):
+            j = free.pop(r[k])
+            self.ep[j] = Ed(k)
+            self.eo[j] = (idx >> k) & 1
+        x = Ed.DL
+        for j in free:
+            self.ep[j] = Ed(x)
+            x += 1
+
     def get_corners(self):
         """Get the permutation of the 8 corners.
             0 <= corners < 40320 defined but unused in phase 1, 0 <= corners < 40320 in phase 2,
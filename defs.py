@@ -1,5 +1,6 @@
 # ###################################### some definitions and constants ################################################
 
+import os
 from enums import Facelet as Fc, Color as Cl
 
 # Map the corner positions to facelet positions.
@@ -37,14 +38,55 @@ N_CORNERS = 40320  # 8! corner permutations
 N_CORNERS_CLASS = 2768  # number of equivalence classes concerning symmetry group D4h
 
 N_UDCORNERS = 35  # Binomial(8,4)/2 possible locations of the four D-corners or complement
+N_EDGES6 = 665280  # 12*11*10*9*8*7 possible positions of the six edges UR, UF, UL, UB, DR and DF
 
 N_SYM = 48  # number of cube symmetries of full group Oh
 N_SYM_D4h = 16  # Number of symmetries of subgroup D4h
 ########################################################################################################################
 
+TABLE_DIR = os.environ.get('BIGOPT_TABLE_DIR', '.')  # Directory of the table files, may be shared and read-only
+TABLE_BUNDLE = 'bigopt.tables'  # If this file exists in TABLE_DIR, the tables are taken from it (see tables.py)
+TABLE_SHM = os.environ.get('BIGOPT_TABLE_SHM')  # Name of a running table server (see tableserver.py). The tables are
+# then attached from its shared memory segments instead of being loaded.
+
 BIG_TABLE = True  # Default value and recommended.
 # With BIG_TABLE = False the 34 MB pruning table is used which leads to a severe performance drop.
 
+CORNER_TWIST_TABLE = False  # Also prune with the 1.5 MB cornertwist_prun table of the corner permutation and twist.
+# It is created in about 40 s with CPython and cuts the search where the corners are far from solved.
+EDGE_TABLE = False  # Also prune with the 42 MB pattern database edges6_prun of the edges UR, UF, UL, UB, DR and DF
+# with their orientation. It is evaluated after all other tables and counts how often it cuts a branch. Creating it
+# and its 48 MB move table move_edges6 takes about two minutes with CPython.
+INVERSE_PRUNING = False  # Also prune with the table values of the inverse position, which has the same distance.
+INVERSE_MIN_TOGO = 9  # The inverse position is computed on the cubie level, which is slow in Python. So only nodes
+# with at least INVERSE_MIN_TOGO moves to go check the inverse of their children. See pf.test_inverse for the cost.
+ROOT_SYMMETRY = True  # With a symmetric cube try only one move of each class of moves which the symmetries of the
+# cube map onto each other at the first two plies. This does not change the solution.
+ENDGAME_DEPTH = 0  # If > 0 the endgame tables hold all positions within ENDGAME_DEPTH moves with their distance and
+# nodes with at most ENDGAME_DEPTH moves to go are solved or cut by one lookup. 5: 0.6 M positions, 6 MB. 6: 8.2 M
+# positions, 74 MB, the creation needs about 1.2 GB and a minute with CPython. 7 would need 1 GB and is not practical.
+
+PRUN_BACKEND = 'array'  # 'array', 'mmap' or 'cache': how the phase1x24x35_prun tables are held after creation.
+# 'array': the tables are read into private memory of the process (about 30 GB for each solver process).
+# 'mmap': the table files are mapped read-only. All processes on a machine share the same physical pages of the page
+# cache and a restarted process is ready in seconds.
+# 'cache': the table files stay on disk and only the most recently used blocks are held in memory. This runs with less
+# than 30 GB memory, the search is slower the smaller the cache is.
+PRUN_CACHE_MB = 4096  # Memory budget for the block cache of the 'cache' backend
+PRUN_CACHE_BLOCK = 4096  # Block size in bytes of the 'cache' backend
+PRUN_LAYOUT = 'slices'  # 'slices': 35 tables, one per udcorners value. 'inner': one table phase1x35x24_prun with
+# udcorners as inner dimension, converted once from the slices. Needs the 'array' or 'mmap' backend without PRUN_BASE3.
+PRUN_BASE3 = False  # Store the finished phase1x24x35_prun tables with 5 entries per byte instead of 4. This needs 20%
+# less memory. The files phase1x24x35_prun3_* are created from the phase1x24x35_prun* files on the first run.
+
+TABLE_WORKERS = 1  # Number of processes which create the phase1x24x35_prun tables. Values > 1 need fork (Linux, macOS).
+TABLE_NUMPY = False  # Create the phase1x24x35_prun tables with NumPy, much faster with CPython. Needs NumPy installed.
+SEARCH_KERNEL = 'iterative'  # 'iterative' (explicit stack, faster) or 'recursive', both generate the same nodes
+SOLVE_WORKERS = 1  # Number of processes which search the tree of one cube. Values > 1 need fork (Linux, macOS).
+SOLUTION_CACHE_SIZE = 100000  # Number of solutions solcache.SolutionCache holds in memory, a few hundred bytes each.
+CHECKPOINT = False  # Save the table creation state after each depth (needs 30 GB more disk space) and resume from it.
+CHECKPOINT_CLASSES = 0  # If > 0 also save every CHECKPOINT_CLASSES flipslicesorted classes (only with one worker).
+
 
 # Table creation times (AMD Ryzen 7 3700X 3.59 GHz):
 # PyPy + 794 MB table: 13 minutes
@@ -0,0 +1,121 @@
+# ################ Endgame table: all positions within ENDGAME_DEPTH moves of the solved cube #########################
+
+# A position is given by the coordinates corners, twist, flip, UD_slice_sorted, RL_slice_sorted and FB_slice_sorted of
+# the search. The three slice_sorted coordinates give the permutation of all 12 edges, the locations of the FB-slice
+# edges follow from the locations of the UD- and RL-slice edges, so only their permutation FB_slice_sorted % 24 is
+# needed. The table is stored in three arrays:
+# starts[corners] ... starts[corners + 1] - 1 are the entries of the positions with this corner permutation
+# keys: for each corner permutation the sorted keys ((((twist * 2048 + flip) * 11880 + UD_slice_sorted) * 11880
+#       + RL_slice_sorted) * 24 + FB_slice_sorted % 24) < 2^54
+# dists: the distance of the position of the key to the solved cube
+
+from bisect import bisect_left
+import array as ar
+import defs
+import moves as mv
+import symmetries as sy
+import tables as tb
+from defs import N_MOVE, N_CORNERS
+
+starts = None  # the tables are filled by create_endgame_table() if ENDGAME_DEPTH > 0
+keys = None
+dists = None
+
+
+def get_key(twist, flip, ud_slice, rl_slice, fb_slice):
+    """The key of a position within the entries of its corner permutation."""
+    return (((twist * 2048 + flip) * 11880 + ud_slice) * 11880 + rl_slice) * 24 + fb_slice % 24
+
+
+def get_depth(corners, twist, flip, ud_slice, rl_slice, fb_slice):
+    """The distance of the position to the solved cube if it is at most ENDGAME_DEPTH, else -1."""
+    lo = starts[corners]
+    hi = starts[corners + 1]
+    k = (((twist * 2048 + flip) * 11880 + ud_slice) * 11880 + rl_slice) * 24 + fb_slice % 24
+    i = bisect_left(keys, k, lo, hi)
+    if i < hi and keys[i] == k:
+        return dists[i]
+    return -1
+
+
+def neighbors(st):
+    """The 18 positions one move away from the position st = (corners, twist, flip, UD, RL, FB slice_sorted)."""
+    corners, twist, flip, ud_slice, rl_slice, fb_slice = st
+    for m in range(N_MOVE):
+        mrl = sy.conj_move[N_MOVE * 16 + m]  # move viewed from 120° rotated position
+        mfb = sy.conj_move[N_MOVE * 32 + m]  # move viewed from 240° rotated position
+        yield m, (mv.corners_move[N_MOVE * corners + m], mv.twist_move[N_MOVE * twist + m],
+                  mv.flip_move[N_MOVE * flip + m], mv.slice_sorted_move[N_MOVE * ud_slice + m],
+                  mv.slice_sorted_move[N_MOVE * rl_slice + mrl], mv.slice_sorted_move[N_MOVE * fb_slice + mfb])
+
+
+def solve_tail(st, depth, last):
+    """The first maneuver in move order which solves the position st with depth moves, the first move may follow the
+    move last (N_MOVE if there is none). depth must be the distance of st in the table."""
+    if depth == 0:
+        return []
+    for m, st1 in neighbors(st):
+        if last < N_MOVE and last // 3 - m // 3 in (0, 3):  # same face or same axis in wrong order
+            continue
+        if get_depth(*st1) == depth - 1:
+            tail = solve_tail(st1, depth - 1, m)
+            if tail is not None:
+                return [m] + tail
+    return None
+
+
+def create_endgame_table():
+    """Create/load the endgame table of all positions within ENDGAME_DEPTH moves."""
+    global starts, keys, dists
+    if defs.ENDGAME_DEPTH <= 0 or starts is not None:
+        return
+    fname = "endgame" + str(defs.ENDGAME_DEPTH)
+    starts = tb.load(fname + "_starts", 'I', N_CORNERS + 1)
+    if starts is not None:
+        n = starts[N_CORNERS]
+        keys = tb.load(fname + "_keys", 'Q', n)
+        dists = tb.load(fname + "_dists", 'B', n)
+        if keys is not None and dists is not None:
+            return
+    print("creating " + fname + " tables...")
+    # Breadth first search which holds only the positions of the last two depths as sets. The neighbors of a position
+    # with depth d have depth d - 1, d or d + 1. A position is packed into one int with 16 + 12 + 11 + 3 * 14 bits.
+    found = []  # (corners << 54) | key << 5 | depth of all positions found so far
+    before = set()
+    level = {0}  # the solved cube
+    for depth in range(defs.ENDGAME_DEPTH + 1):
+        for p in level:
+            corners = p >> 65
+            key = get_key((p >> 53) & 4095, (p >> 42) & 2047, (p >> 28) & 16383, (p >> 14) & 16383, p & 16383)
+            found.append((((corners << 54) | key) << 5) | depth)
+        print('depth:', depth, 'positions: ' + str(len(level)))
+        if depth == defs.ENDGAME_DEPTH:
+            break
+        new = set()
+        for i, p in enumerate(level):
+            if (i + 1) % 200000 == 0:
+                print('.', end='', flush=True)
+            st = (p >> 65, (p >> 53) & 4095, (p >> 42) & 2047, (p >> 28) & 16383, (p >> 14) & 16383, p & 16383)
+            for m, st1 in neighbors(st):
+                p1 = st1[0] << 65 | st1[1] << 53 | st1[2] << 42 | st1[3] << 28 | st1[4] << 14 | st1[5]
+                if p1 not in level and p1 not in before:
+                    new.add(p1)
+        if len(level) >= 200000:
+            print()
+        before = level
+        level = new
+    before = level = None
+
+    found.sort()
+    starts = ar.array('I', [0] * (N_CORNERS + 1))
+    keys = ar.array('Q', [0]) * len(found)
+    dists = ar.array('B', [0]) * len(found)
+    for i, f in enumerate(found):
+        starts[(f >> 59) + 1] += 1
+        keys[i] = (f >> 5) & ((1 << 54) - 1)
+        dists[i] = f & 31
+    for c in range(N_CORNERS):
+        starts[c + 1] += starts[c]
+    tb.save(fname + "_starts", starts)
+    tb.save(fname + "_keys", keys)
+    tb.save(fname + "_dists", dists)
@@ -1,130 +1,183 @@
 # ################### Movetables describe the transformation of the coordinates by cube moves. #########################
 
-from os import path
 import array as ar
 import cubie as cb
+import tables as tb
 import enums
-from defs import N_TWIST, N_FLIP, N_SLICE_SORTED, N_CORNERS,  N_MOVE, N_UDCORNERS
+import defs
+from defs import N_TWIST, N_FLIP, N_SLICE_SORTED, N_CORNERS,  N_MOVE, N_UDCORNERS, N_EDGES6
 
-a = cb.CubieCube()
-# ######################################### Move table for the twists of the corners. ##################################
+twist_move = None  # the move tables are filled by init()
+flip_move = None
+slice_sorted_move = None
+corners_move = None
+udcorners_move = None
+twcorn_move = None  # joint move table of twist and udcorners
+edges6_move = None  # move table of the six edges UR..DF, only with EDGE_TABLE
 
-# The twist coordinate describes the 3^7 = 2187 possible orientations of the 8 corners
-# 0 <= twist < 2187 in phase 1, twist = 0 in phase 2
-fname = "move_twist"
-if not path.isfile(fname):
-    print("creating " + fname + " table...")
-    twist_move = ar.array('H', [0 for i in range(N_TWIST * N_MOVE)])
-    for i in range(N_TWIST):
-        a.set_twist(i)
-        for j in enums.Color:  # six faces U, R, F, D, L, B
-            for k in range(3):  # three moves for each face, for example U, U2, U3 = U'
-                a.corner_multiply(cb.basicMoveCube[j])
-                twist_move[N_MOVE * i + 3 * j + k] = a.get_twist()
-            a.corner_multiply(cb.basicMoveCube[j])  # 4. move restores face
-    fh = open(fname, "wb")
-    twist_move.tofile(fh)
-else:
-    print("loading " + fname + " table...")
-    fh = open(fname, "rb")
-    twist_move = ar.array('H')
-    twist_move.fromfile(fh, N_TWIST * N_MOVE)
-fh.close()
-########################################################################################################################
 
-# ####################################  Move table for the flip of the edges. ##########################################
+def init():
+    """Load or create the move tables."""
+    global twist_move, flip_move, slice_sorted_move, corners_move, udcorners_move, twcorn_move
+    if defs.EDGE_TABLE:
+        init_edges6()
+    if twcorn_move is not None:
+        return
+    a = cb.CubieCube()
+    # ######################################### Move table for the twists of the corners. ##############################
 
-# The flip coordinate describes the 2^11 = 2048 possible orientations of the 12 edges
-# 0 <= flip < 2048 in phase 1, flip = 0 in phase 2
-fname = "move_flip"
-if not path.isfile(fname):
-    print("creating " + fname + " table...")
-    flip_move = ar.array('H', [0 for i in range(N_FLIP * N_MOVE)])
-    for i in range(N_FLIP):
-        a.set_flip(i)
-        for j in enums.Color:
-            for k in range(3):
+    # The twist coordinate describes the 3^7 = 2187 possible orientations of the 8 corners
+    # 0 <= twist < 2187 in phase 1, twist = 0 in phase 2
+    fname = "move_twist"
+    twist_move = tb.load(fname, 'H', N_TWIST * N_MOVE)
+    if twist_move is None:
+        print("creating " + fname + " table...")
+        twist_move = ar.array('H', [0 for i in range(N_TWIST * N_MOVE)])
+        for i in range(N_TWIST):
+            a.set_twist(i)
+            for j in enums.Color:  # six faces U, R, F, D, L, B
+                for k in range(3):  # three moves for each face, for example U, U2, U3 = U'
+                    a.corner_multiply(cb.basicMoveCube[j])
+                    twist_move[N_MOVE * i + 3 * j + k] = a.get_twist()
+                a.corner_multiply(cb.basicMoveCube[j])  # 4. move restores face
+        tb.save(fname, twist_move)
+    ####################################################################################################################
+
+    # ####################################  Move table for the flip of the edges. ######################################
+
+    # The flip coordinate describes the 2^11 = 2048 possible orientations of the 12 edges
+    # 0 <= flip < 2048 in phase 1, flip = 0 in phase 2
+    fname = "move_flip"
+    flip_move = tb.load(fname, 'H', N_FLIP * N_MOVE)
+    if flip_move is None:
+        print("creating " + fname + " table...")
+        flip_move = ar.array('H', [0 for i in range(N_FLIP * N_MOVE)])
+        for i in range(N_FLIP):
+            a.set_flip(i)
+            for j in enums.Color:
+                for k in range(3):
+                    a.edge_multiply(cb.basicMoveCube[j])
+                    flip_move[N_MOVE * i + 3 * j + k] = a.get_flip()
                 a.edge_multiply(cb.basicMoveCube[j])
-                flip_move[N_MOVE * i + 3 * j + k] = a.get_flip()
-            a.edge_multiply(cb.basicMoveCube[j])
-    fh = open(fname, "wb")
-    flip_move.tofile(fh)
-else:
-    print("loading " + fname + " table...")
-    fh = open(fname, "rb")
-    flip_move = ar.array('H')
-    flip_move.fromfile(fh, N_FLIP * N_MOVE)
-fh.close()
-########################################################################################################################
+        tb.save(fname, flip_move)
+    ####################################################################################################################
 
-# ###################### Move table for the four UD-slice edges FR, FL, Bl and BR. #####################################
+    # ###################### Move table for the four UD-slice edges FR, FL, Bl and BR. #################################
 
-# The slice_sorted coordinate describes the 12!/8! = 11880 possible positions of the FR, FL, BL and BR edges.
-# Though for phase 1 only the "unsorted" slice coordinate with Binomial(12,4) = 495 positions is relevant, using the
-# slice_sorted coordinate gives us the permutation of the FR, FL, BL and BR edges at the beginning of phase 2 for free.
-# 0 <= slice_sorted < 11880 in phase 1, 0 <= slice_sorted < 24 in phase 2, slice_sorted = 0 for solved cube
-fname = "move_slice_sorted"
-if not path.isfile(fname):
-    print("creating " + fname + " table...")
-    slice_sorted_move = ar.array('H', [0 for i in range(N_SLICE_SORTED * N_MOVE)])
-    for i in range(N_SLICE_SORTED):
-        if i % 200 == 0:
-            print('.', end='', flush=True)
-        a.set_slice_sorted(i)
-        for j in enums.Color:
-            for k in range(3):
+    # The slice_sorted coordinate describes the 12!/8! = 11880 possible positions of the FR, FL, BL and BR edges.
+    # Though for phase 1 only the "unsorted" slice coordinate with Binomial(12,4) = 495 positions is relevant, using the
+    # slice_sorted coordinate gives us the permutation of the FR, FL, BL and BR edges at the beginning of phase 2 for
+    # free.
+    # 0 <= slice_sorted < 11880 in phase 1, 0 <= slice_sorted < 24 in phase 2, slice_sorted = 0 for solved cube
+    fname = "move_slice_sorted"
+    slice_sorted_move = tb.load(fname, 'H', N_SLICE_SORTED * N_MOVE)
+    if slice_sorted_move is None:
+        print("creating " + fname + " table...")
+        slice_sorted_move = ar.array('H', [0 for i in range(N_SLICE_SORTED * N_MOVE)])
+        for i in range(N_SLICE_SORTED):
+            if i % 200 == 0:
+                print('.', end='', flush=True)
+            a.set_slice_sorted(i)
+            for j in enums.Color:
+                for k in range(3):
+                    a.edge_multiply(cb.basicMoveCube[j])
+                    slice_sorted_move[N_MOVE * i + 3 * j + k] = a.get_slice_sorted()
                 a.edge_multiply(cb.basicMoveCube[j])
-                slice_sorted_move[N_MOVE * i + 3 * j + k] = a.get_slice_sorted()
-            a.edge_multiply(cb.basicMoveCube[j])
-    fh = open(fname, "wb")
-    slice_sorted_move.tofile(fh)
-    print()
-else:
-    print("loading " + fname + " table...")
-    fh = open(fname, "rb")
-    slice_sorted_move = ar.array('H')
-    slice_sorted_move.fromfile(fh, N_SLICE_SORTED * N_MOVE)
-fh.close()
-########################################################################################################################
+        tb.save(fname, slice_sorted_move)
+        print()
+    ####################################################################################################################
 
-# ########################################## Move table for the corners. ###############################################
+    # ########################################## Move table for the corners. ###########################################
 
-# The corners coordinate describes the 8! = 40320 permutations of the corners.
-# 0 <= corners < 40320 defined but unused in phase 1, 0 <= corners < 40320 in phase 2, corners = 0 for solved cube
-fname = "move_corners"
-if not path.isfile(fname):
-    print("creating " + fname + " table...")
-    corners_move = ar.array('H', [0 for i in range(N_CORNERS * N_MOVE)])
-    for i in range(N_CORNERS):
-        if (i+1) % 200 == 0:
-            print('.', end='', flush=True)
-        if(i+1) % 16000 == 0:
-            print('')
-        a.set_corners(i)
-        for j in enums.Color:
-            for k in range(3):
+    # The corners coordinate describes the 8! = 40320 permutations of the corners.
+    # 0 <= corners < 40320 defined but unused in phase 1, 0 <= corners < 40320 in phase 2, corners = 0 for solved cube
+    fname = "move_corners"
+    corners_move = tb.load(fname, 'H', N_CORNERS * N_MOVE)
+    if corners_move is None:
+        print("creating " + fname + " table...")
+        corners_move = ar.array('H', [0 for i in range(N_CORNERS * N_MOVE)])
+        for i in range(N_CORNERS):
+            if (i+1) % 200 == 0:
+                print('.', end='', flush=True)
+            if(i+1) % 16000 == 0:
+                print('')
+            a.set_corners(i)
+            for j in enums.Color:
+                for k in range(3):
+                    a.corner_multiply(cb.basicMoveCube[j])
+                    corners_move[N_MOVE * i + 3 * j + k] = a.get_corners()
                 a.corner_multiply(cb.basicMoveCube[j])
-                corners_move[N_MOVE * i + 3 * j + k] = a.get_corners()
-            a.corner_multiply(cb.basicMoveCube[j])
-    fh = open(fname, "wb")
-    corners_move.tofile(fh)
-    fh.close()
-    print()
-else:
-    print("loading " + fname + " table...")
-    fh = open(fname, "rb")
-    corners_move = ar.array('H')
-    corners_move.fromfile(fh, N_CORNERS * N_MOVE)
-fh.close()
-########################################################################################################################
+        tb.save(fname, corners_move)
+        print()
+    ####################################################################################################################
+
+    # ######################################### Move table for the UD corners. #########################################
+    udcorners_move = ar.array('B', [0 for i in range(N_UDCORNERS * N_MOVE)])
+    for i in range(N_UDCORNERS):
+        a.set_dcorners(i)
+        for j in enums.Color:  # six faces U, R, F, D, L, B
+            for k in range(3):  # three moves for each face, for example U, U2, U3 = U'
+                a.corner_multiply(cb.basicMoveCube[j])
+                udcorners_move[N_MOVE * i + 3 * j + k] = a.get_udcorners()
+            a.corner_multiply(cb.basicMoveCube[j])  # 4. move restores face
+    ####################################################################################################################
+
+    # ########################## Joint move table for the twist and the udcorners coordinate #########################
+    # twcorn = N_TWIST * udcorners + twist < 76545. One lookup moves both coordinates.
+    fname = "move_twcorn"
+    twcorn_move = tb.load(fname, 'I', N_TWIST * N_UDCORNERS * N_MOVE)
+    if twcorn_move is None:
+        print("creating " + fname + " table...")
+        twcorn_move = ar.array('I')
+        for c in range(N_UDCORNERS):
+            c_new = [N_TWIST * udcorners_move[N_MOVE * c + j] for j in range(N_MOVE)]
+            for t in range(N_TWIST):
+                twcorn_move.extend(c_new[j] + twist_move[N_MOVE * t + j] for j in range(N_MOVE))
+        tb.save(fname, twcorn_move)
+    ####################################################################################################################
+
 
-# ######################################### Move table for the UD corners. #############################################
-udcorners_move = ar.array('B', [0 for i in range(N_UDCORNERS * N_MOVE)])
-for i in range(N_UDCORNERS):
-    a.set_dcorners(i)
-    for j in enums.Color:  # six faces U, R, F, D, L, B
-        for k in range(3):  # three moves for each face, for example U, U2, U3 = U'
-            a.corner_multiply(cb.basicMoveCube[j])
-            udcorners_move[N_MOVE * i + 3 * j + k] = a.get_udcorners()
-        a.corner_multiply(cb.basicMoveCube[j])  # 4. move restores face
-########################################################################################################################
+def init_edges6():
+    """Load or create the move table of the six edges UR, UF, UL, UB, DR and DF."""
+    global edges6_move
+    if edges6_move is not None:
+        return
+    # The entry for the positions a = edges6 >> 6 and move m is (a1 << 6) | flipmask with the new positions a1 and the
+    # orientation changes of the six edges, so edges6_move[N_MOVE * (edges6 >> 6) + m] ^ (edges6 & 63) is the new
+    # edges6 coordinate.
+    fname = "move_edges6"
+    edges6_move = tb.load(fname, 'I', N_EDGES6 * N_MOVE)
+    if edges6_move is None:
+        print("creating " + fname + " table...")
+        # the edge in position p goes to position dest[m][p] by move m and changes its orientation by flip[m][p]
+        dest = [[0] * 12 for m in range(N_MOVE)]
+        flip = [[0] * 12 for m in range(N_MOVE)]
+        for m in range(N_MOVE):
+            for q in range(12):
+                dest[m][cb.moveCube[m].ep[q]] = q
+                flip[m][cb.moveCube[m].ep[q]] = cb.moveCube[m].eo[q]
+        edges6_move = ar.array('I', [0]) * (N_EDGES6 * N_MOVE)
+        r = [0] * 6
+        for i in range(N_EDGES6):
+            if (i + 1) % 20000 == 0:
+                print('.', end='', flush=True)
+            a = i
+            for k in range(5, -1, -1):
+                r[k] = a % (12 - k)
+                a //= 12 - k
+            free = list(range(12))
+            pos = [free.pop(r[k]) for k in range(6)]
+            for m in range(N_MOVE):
+                d = dest[m]
+                free = list(range(12))
+                a = 0
+                mask = 0
+                for k in range(6):
+                    p = d[pos[k]]
+                    j = free.index(p)
+                    a = (12 - k) * a + j
+                    free.pop(j)
+                    mask |= flip[m][pos[k]] << k
+                edges6_move[N_MOVE * i + m] = (a << 6) | mask
+        tb.save(fname, edges6_move)
+        print()
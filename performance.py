@@ -1,28 +1,240 @@
 from cubie import CubieCube
+from enums import Move
 import solver as sv
+import pruning as pr
+import symmetries as sy
+import moves as mv
+import endgame as eg
+import defs
+import array as ar
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 
 
-def test(n):
+def random_cubes(n):
+    """Return the cube definition strings of n random cubes."""
+    cc = CubieCube()
+    cubes = []
+    for i in range(n):
+        cc.randomize()
+        cubes.append(cc.to_facelet_cube().to_string())
+    return cubes
+
+
+@contextmanager
+def temporarily(module, **settings):
+    """Set the attributes of module, for example defs, to settings and restore the old values when the block is left.
+    So the later solves of the process use the configuration of defs.py again."""
+    old = {name: getattr(module, name) for name in settings}
+    try:
+        for name, value in settings.items():
+            setattr(module, name, value)
+        yield
+    finally:
+        for name, value in old.items():
+            setattr(module, name, value)
+
+
+def solve_all(cubes, module=defs, **settings):
+    """Solve the cubes one by one with a single process, with the attributes of module (defs if not given) temporarily
+    set to settings. The tables are loaded before the clock starts. Returns the solvers, which hold the counters of
+    their solve, and the time in s."""
+    with temporarily(module, **settings):
+        sv.init()
+        start_time = time.monotonic()
+        solvers = []
+        for s in cubes:
+            solver = sv.Solver()
+            solver.solve(s, 1)
+            solvers.append(solver)
+        return solvers, time.monotonic() - start_time
+
+
+def depth_nodes(solvers):
+    """Return depth -> number of nodes the solvers generated for this depth."""
+    nodes = {}
+    for solver in solvers:
+        for d, c in solver.depth_nodes.items():
+            nodes[d] = nodes.get(d, 0) + c
+    return nodes
+
+
+def test(n, workers=1):
     """
     Optimally solve n random cubes with information about the solving process
     :param n: THe number of random cubes to solve
+    :param workers: Number of processes which solve the cubes in parallel
     """
     start_time = time.monotonic()
-    cc = CubieCube()
     cnt = [0] * 31
-    for i in range(n):
-        cc.randomize()
-        fc = cc.to_facelet_cube()
-        s = fc.to_string()
-        print(str(i+1) + '. ' + s)
-        s = sv.solve(s)
+    errors = 0
+    cubes = random_cubes(n)
+    for i, s in sv.solve_many(cubes, workers):
+        print(str(i+1) + '. ' + cubes[i])
         print(s)
         print()
+        if s.startswith('Error'):  # solve_many gives the errors of the workers as strings
+            errors += 1
+            continue
         cnt[int(s.split('(')[1].split('f')[0])] += 1
     avr = 0
     for i in range(31):
         avr += i * cnt[i]
-    avr /= n
+    avr /= max(n - errors, 1)
     print('average ' + '%.2f' % avr + ' moves', dict(zip(range(31), cnt)))
+    if errors > 0:
+        print(str(errors) + ' cubes not solved')
     print('total time for ' + str(n) + ' cubes: ' + str(round(time.monotonic() - start_time, 2)) + ' s')
+
+
+def test_kernels(n):
+    """
+    Solve n random cubes with the recursive and the iterative search kernel and compare the nodes/s
+    :param n: The number of random cubes to solve
+    """
+    cubes = random_cubes(n)
+    for kernel in ('recursive', 'iterative'):
+        solvers, t = solve_all(cubes, SEARCH_KERNEL=kernel)
+        nodes = sum(solver.totnodes for solver in solvers)
+        print(kernel + ' kernel (' + defs.PRUN_BACKEND + ' backend): ' + str(nodes) + ' nodes in ' + str(round(t, 2)) +
+              ' s, about ' + str(round(nodes / t)) + ' nodes/s')
+
+
+def test_cornertwist(n):
+    """
+    Solve n random cubes without and with the cornertwist pruning table and compare the generated nodes
+    :param n: The number of random cubes to solve
+    """
+    cubes = random_cubes(n)
+    with temporarily(defs, CORNER_TWIST_TABLE=True), temporarily(pr, cornertwist_depth3=None):
+        sv.init()
+        sy.init()  # the corners classes if the tiers were loaded without CORNER_TWIST_TABLE
+        pr.create_cornertwist_table()
+        for table in (None, pr.cornertwist_depth3):
+            solvers, t = solve_all(cubes, pr, cornertwist_depth3=table)
+            print(('with' if table is not None else 'without') + ' cornertwist table: ' +
+                  str(sum(solver.totnodes for solver in solvers)) + ' nodes in ' + str(round(t, 2)) + ' s')
+
+
+def test_edges(n):
+    """
+    Solve n random cubes without and with the edge pattern database and report how often it cuts a branch which the
+    other tables do not cut
+    :param n: The number of random cubes to solve
+    """
+    cubes = random_cubes(n)
+    depth_edges = {}  # depth -> [probes, cutoffs] with the table
+    with temporarily(defs, EDGE_TABLE=True), temporarily(pr, edge_depth=None):
+        sv.init()
+        mv.init()  # the move table of the edges if the tiers were loaded without EDGE_TABLE
+        pr.create_edgeprun_table()
+        for table in (None, pr.edge_depth):
+            solvers, t = solve_all(cubes, pr, edge_depth=table)
+            for solver in solvers:
+                for d, (probes, cutoffs) in solver.depth_edges.items():
+                    c = depth_edges.setdefault(d, [0, 0])
+                    c[0] += probes
+                    c[1] += cutoffs
+            print(('with' if table is not None else 'without') + ' edges6_prun table: ' +
+                  str(sum(solver.totnodes for solver in solvers)) + ' nodes in ' + str(round(t, 2)) + ' s')
+    probes = sum(c[0] for c in depth_edges.values())
+    cutoffs = sum(c[1] for c in depth_edges.values())
+    print('edges6_prun cut ' + str(cutoffs) + ' of ' + str(probes) + ' nodes which passed all other tables (' +
+          str(round(100 * cutoffs / max(probes, 1), 1)) + '%)')
+    print('depth     probes    cutoffs')
+    for d in sorted(depth_edges):
+        print('%5d %10d %10d' % (d, depth_edges[d][0], depth_edges[d][1]))
+
+
+def test_inverse(n):
+    """
+    Solve n random cubes without and with the pruning by the inverse positions and print the nodes/s and the generated
+    nodes per depth
+    :param n: The number of random cubes to solve
+    """
+    cubes = random_cubes(n)
+    nodes = []  # depth -> generated nodes without and with the pruning
+    for inverse in (False, True):
+        solvers, t = solve_all(cubes, INVERSE_PRUNING=inverse)
+        nodes.append(depth_nodes(solvers))
+        total = sum(nodes[inverse].values())
+        print(('with' if inverse else 'without') + ' inverse pruning: ' + str(total) + ' nodes in ' +
+              str(round(t, 2)) + ' s, about ' + str(round(total / t)) + ' nodes/s')
+    print('depth    without       with')
+    for d in sorted(set(nodes[0]) | set(nodes[1])):
+        print('%5d %10d %10d' % (d, nodes[0].get(d, 0), nodes[1].get(d, 0)))
+
+
+def test_endgame(n, depth=6):
+    """
+    Solve n random cubes without and with the endgame tables and print the generated nodes per depth
+    :param n: The number of random cubes to solve
+    :param depth: The ENDGAME_DEPTH of the tables
+    """
+    cubes = random_cubes(n)
+    nodes = []  # depth -> generated nodes without and with the tables
+    with temporarily(defs, ENDGAME_DEPTH=depth), temporarily(eg, starts=None, keys=None, dists=None):
+        sv.init()
+        eg.create_endgame_table()
+        for tables in (None, eg.starts):
+            solvers, t = solve_all(cubes, eg, starts=tables)
+            nodes.append(depth_nodes(solvers))
+            print(('with' if tables is not None else 'without') + ' endgame tables: ' + str(sum(nodes[-1].values())) +
+                  ' nodes in ' + str(round(t, 2)) + ' s')
+    print('depth    without       with')
+    for d in sorted(set(nodes[0]) | set(nodes[1])):
+        print('%5d %10d %10d' % (d, nodes[0].get(d, 0), nodes[1].get(d, 0)))
+
+
+def test_symmetric(patterns=('U2 D2 F2 B2 R2 L2', 'U1 D3 R1 L3 F1 B3 U1 D3', 'U2 R2 F2 U2 D2 F2 R2 U2',
+                              'F2 B2 U1 D3 F2 B2 U1 D3')):
+    """
+    Solve symmetric pattern cubes without and with ROOT_SYMMETRY and print the generated nodes
+    :param patterns: The maneuvers which generate the pattern cubes
+    """
+    for p in patterns:
+        cc = CubieCube()
+        for m in p.split():
+            cc.move(Move[m])
+        print(p + ': ' + str(len([j for j in cc.symmetries() if j < defs.N_SYM])) + ' symmetries')
+        for root_symmetry in (False, True):
+            solvers, t = solve_all([cc.to_facelet_cube().to_string()], ROOT_SYMMETRY=root_symmetry)
+            print(('with' if root_symmetry else 'without') + ' root symmetry: ' + str(solvers[0].totnodes) +
+                  ' nodes in ' + str(round(t, 2)) + ' s')
+
+
+def test_layout(n, cache_mb=32):
+    """
+    Solve n random cubes and count the cache misses per node of the phase1x24x35_prun lookups for both table layouts,
+    with a simulated LRU cache of 64 byte lines
+    :param n: The number of random cubes to solve
+    :param cache_mb: The size of the simulated cache in megabytes
+    """
+    itemsize = ar.array('L').itemsize
+    slice_bytes = (defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST // 16 + 1) * itemsize
+    max_lines = (cache_mb << 20) >> 6
+    caches = [OrderedDict(), OrderedDict()]  # 'slices' and 'inner' layout
+    misses = [0, 0]
+    sv.init()
+    get = pr.get_fsstc_depth3
+
+    def traced_get(cn, ix):
+        for k, addr in enumerate((cn * slice_bytes + (ix >> 4) * itemsize,
+                                  ((ix * defs.N_UDCORNERS + cn) >> 4) * itemsize)):
+            cache = caches[k]
+            line = addr >> 6
+            if line in cache:
+                cache.move_to_end(line)
+            else:
+                misses[k] += 1
+                cache[line] = True
+                if len(cache) > max_lines:
+                    cache.popitem(last=False)
+        return get(cn, ix)
+
+    solvers, t = solve_all(random_cubes(n), pr, get_fsstc_depth3=traced_get)
+    nodes = sum(solver.totnodes for solver in solvers)
+    for k, layout in enumerate(('slices', 'inner')):
+        print(layout + ' layout: ' + str(misses[k]) + ' cache misses, ' + '%.3f' % (misses[k] / max(nodes, 1)) +
+              ' per node')
@@ -6,11 +6,27 @@ import enums
 import moves as mv
 import symmetries as sy
 import cubie as cb
+import tables as tb
 from os import path
+import os
+import shutil
 import array as ar
+import mmap
+import multiprocessing as mp
+import json
+import zlib
+import threading
+from collections import OrderedDict
 
 fsstc_depth3 = [ar.array('L')]*defs.N_UDCORNERS
-corner_depth = ar.array
+fsstc_depth3_inner = None  # the table with PRUN_LAYOUT = 'inner'
+corner_depth = None  # the corner pruning table, filled by create_cornerprun_table()
+cornertwist_depth3 = None  # the table of the corners classes and the twist with CORNER_TWIST_TABLE
+edge_depth = None  # the pattern database of the six edges UR..DF with EDGE_TABLE
+
+prun_cache = None  # BlockCache with PRUN_BACKEND = 'cache'
+
+shared_fs_sym = None  # symmetries of the flipslicesorted classes, inherited by the pool workers
 
 
 # ####################### functions to extract or set values in the pruning tables #####################################
@@ -24,18 +40,527 @@ def get_fsstc_depth3(cn, ix):
 def set_fsstc_depth3(cn, ix, value):
     shift = (ix % 16) * 2
     base = ix >> 4
-    fsstc_depth3[cn][base] &= ~(3 << shift) & 0xffffffff
-    fsstc_depth3[cn][base] |= value << shift
+    # a single store, so a parallel reader never sees a half written entry
+    fsstc_depth3[cn][base] = fsstc_depth3[cn][base] & ~(3 << shift) & 0xffffffff | value << shift
+
+
+# With PRUN_BASE3 the finished table holds only the values 0, 1 and 2 and 5 entries are stored in one byte as
+# e0 + 3*e1 + 9*e2 + 27*e3 + 81*e4 < 243. trit[5*b + k] gives entry ek of byte b.
+trit = ar.array('B', [(b // 3 ** k) % 3 for b in range(243) for k in range(5)])
+
+
+def get_fsstc_depth3_base3(cn, ix):
+    return trit[5 * fsstc_depth3[cn][ix // 5] + ix % 5]
+
+
+# With PRUN_LAYOUT = 'inner' the udcorners coordinate is the inner dimension of one table, the entries of all 35
+# udcorners values of a flipslicesorted class and twist are adjacent.
+def get_fsstc_depth3_inner(cn, ix):
+    j = ix * 35 + cn  # defs.N_UDCORNERS = 35
+    return (fsstc_depth3_inner[j >> 4] >> ((j & 15) << 1)) & 3
+
+
+def get_fsstc_depth3_cache(cn, ix):
+    y = prun_cache.item(cn, ix // 16)
+    y >>= (ix % 16) * 2
+    return y & 3
+
+
+def get_fsstc_depth3_base3_cache(cn, ix):
+    return trit[5 * prun_cache.item(cn, ix // 5) + ix % 5]
+
+
+class BlockCache:
+    """Give access to the items of the 35 table files while only a part of them is held in memory. The files are read
+    in blocks of block_size bytes and at most budget bytes of the most recently used blocks are kept. A table can also
+    start at an offset within its file, this is used for the tables in a table bundle."""
+
+    def __init__(self, fnames, typecode, block_size, budget, offsets=None):
+        self.files = [open(f, 'rb') for f in fnames]
+        self.offsets = offsets if offsets is not None else [0] * len(fnames)  # start of the table within the file
+        self.typecode = typecode
+        self.block_size = block_size
+        self.items_per_block = block_size // ar.array(typecode).itemsize
+        self.max_blocks = max(1, budget // block_size)
+        self.blocks = OrderedDict()  # (cn << 32) + block number -> items of the block, least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def item(self, cn, i):
+        """Item i of file cn."""
+        b, j = divmod(i, self.items_per_block)
+        key = (cn << 32) + b
+        with self.lock:
+            block = self.blocks.get(key)
+            if block is not None:
+                self.hits += 1
+                self.blocks.move_to_end(key)
+                return block[j]
+            self.misses += 1
+            fh = self.files[cn]
+            if hasattr(os, 'pread'):  # no shared file position, forked processes may read the same file
+                data = os.pread(fh.fileno(), self.block_size, self.offsets[cn] + b * self.block_size)
+            else:
+                fh.seek(self.offsets[cn] + b * self.block_size)
+                data = fh.read(self.block_size)
+            block = ar.array(self.typecode, data)
+            self.blocks[key] = block
+            if len(self.blocks) > self.max_blocks:
+                self.blocks.popitem(last=False)
+                self.evictions += 1
+            return block[j]
+
+    def stats(self):
+        """Counters of the cache."""
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'blocks': len(self.blocks),
+                'max_blocks': self.max_blocks}
+
+    def close(self):
+        for fh in self.files:
+            fh.close()
+        self.blocks.clear()
 
 ########################################################################################################################
 
 
+def create_fs_sym_table():
+    """For each flipslicesorted class store the symmetries of D4h which leave the representant invariant as bitmask."""
+    cc = cb.CubieCube()
+    fs_sym = ar.array('L', [0] * defs.N_FLIPSLICESORTED_CLASS)
+    for i in range(defs.N_FLIPSLICESORTED_CLASS):
+        if (i + 1) % 24000 == 0:
+            print('.', end='', flush=True)
+        rep = sy.flipslicesorted_rep[i]
+        cc.set_slice_sorted(rep // defs.N_FLIP)
+        cc.set_flip(rep % defs.N_FLIP)
+
+        for s in range(defs.N_SYM_D4h):
+            ss = cb.CubieCube(sy.symCube[s].cp, sy.symCube[s].co, sy.symCube[s].ep,
+                              sy.symCube[s].eo)  # copy cube
+            ss.edge_multiply(cc)  # s*cc
+            ss.edge_multiply(sy.symCube[sy.inv_idx[s]])  # s*cc*s^-1
+            if ss.get_slice_sorted() == rep // defs.N_FLIP and ss.get_flip() == rep % defs.N_FLIP:
+                fs_sym[i] |= 1 << s
+    print()
+    return fs_sym
+
+
+FILL_BUFFER = 1 << 20  # entries for one other slice a worker buffers in memory before it appends them to the file
+FILL_ROUND_CLASSES = 1000  # flipslicesorted classes of a forward step round, after each round the fill files are
+# applied and removed. This bounds the fill files to about 35 * 1000 * 2187 * 18 * 4 bytes = 5.5 GB, the few symmetric
+# flipslicesorted classes add a little to this.
+
+
+class SliceFills:
+    """The entries of other slices which a worker finds in a forward step of the parallel table creation. Each worker
+    only writes into the slice of its task, the entries for slice target are appended to the file
+    <fname>.fill<udcorners>_<target> and set by the worker of slice target after all tasks of the round are done.
+    Entries which are found several times within a round are merged in memory, the buffer of a target is only
+    written when it is full."""
+
+    def __init__(self, fname, udcorners):
+        self.prefix = fname + '.fill' + str(udcorners) + '_'
+        self.bufs = [ar.array('I') for i in range(defs.N_UDCORNERS)]  # N_TWIST * N_FLIPSLICESORTED_CLASS < 2^32
+
+    def add(self, target, idx):
+        buf = self.bufs[target]
+        buf.append(idx)
+        if len(buf) >= FILL_BUFFER:
+            self.flush(target)
+
+    def flush(self, target):
+        buf = self.bufs[target]
+        if len(buf) > 0:
+            fh = open(self.prefix + str(target), "ab")
+            ar.array('I', sorted(set(buf))).tofile(fh)  # an entry may be found several times
+            fh.close()
+            self.bufs[target] = ar.array('I')
+
+    def close(self):
+        for target in range(defs.N_UDCORNERS):
+            self.flush(target)
+
+
+def apply_bigprun_fills(fname, udcorners, value):
+    """Set the entries of slice udcorners which the other workers found in the last round of a forward step and remove
+    their files. Returns the number of newly filled entries."""
+    done = 0
+    for source in range(defs.N_UDCORNERS):
+        fn = fname + '.fill' + str(source) + '_' + str(udcorners)
+        if not path.isfile(fn):
+            continue
+        fh = open(fn, "rb")
+        while True:
+            idxs = ar.array('I')
+            try:
+                idxs.fromfile(fh, FILL_BUFFER)
+            except EOFError:  # the last part of the file, idxs has the rest of the entries
+                pass
+            for idx in idxs:
+                if get_fsstc_depth3(udcorners, idx) == 3:
+                    set_fsstc_depth3(udcorners, idx, value)
+                    done += 1
+            if len(idxs) < FILL_BUFFER:
+                break
+        fh.close()
+        os.remove(fn)
+    return done
+
+
+def remove_bigprun_fills(fname):
+    """Remove the fill files of an interrupted parallel table creation."""
+    for source in range(defs.N_UDCORNERS):
+        for target in range(defs.N_UDCORNERS):
+            if path.isfile(fname + '.fill' + str(source) + '_' + str(target)):
+                os.remove(fname + '.fill' + str(source) + '_' + str(target))
+
+
+def expand_bigprun_slice(udcorners, depth, backsearch, fs_sym, start=0, checkpoint=None, fills=None, end=None):
+    """Do one step of the breadth first search for the entries of slice udcorners of the phase1x24x35 table. In a
+    forward step the neighbors of all entries with the given depth are filled, in a backward step all unfilled entries
+    of the slice with a neighbor of the given depth. Returns the number of filled entries.
+    The step begins with flipslicesorted class start and ends before class end. checkpoint(fs_classidx, done) is called
+    every CHECKPOINT_CLASSES classes. With fills (a SliceFills) the entries of the other slices are not set but
+    collected in fills, they are not counted in the result."""
+    if end is None:
+        end = defs.N_FLIPSLICESORTED_CLASS
+    depth3 = depth % 3
+    done = 0
+    idx = defs.N_TWIST * start
+    for fs_classidx in range(start, end):
+        if (fs_classidx + 1) % 20000 == 0:
+            print('.', end='', flush=True)
+        if checkpoint is not None and fs_classidx > start and fs_classidx % defs.CHECKPOINT_CLASSES == 0:
+            checkpoint(fs_classidx, done)
+
+        twist = 0
+        while twist < defs.N_TWIST:
+            # ########## if table entries are not populated, this is very fast: ########################################
+            if not backsearch and idx % 16 == 0 and fsstc_depth3[udcorners][idx // 16] == 0xffffffff \
+                    and twist < defs.N_TWIST - 16:
+                twist += 16
+                idx += 16
+                continue
+            ############################################################################################################
+
+            if backsearch:
+                match = (get_fsstc_depth3(udcorners, idx) == 3)
+            else:
+                match = (get_fsstc_depth3(udcorners, idx) == depth3)
+
+            if match:
+                flipslicesorted = sy.flipslicesorted_rep[fs_classidx]
+                flip = flipslicesorted % 2048  # defs.N_FLIP = 2048
+                slicesorted = flipslicesorted >> 11  # // defs.N_FLIP
+                for m in enums.Move:
+                    twist1 = mv.twist_move[18 * twist + m]  # defs.N_MOVE = 18
+                    udcorners1 = mv.udcorners_move[18 * udcorners + m]
+                    flip1 = mv.flip_move[18 * flip + m]
+                    slicesorted1 = mv.slice_sorted_move[18 * slicesorted + m]
+                    flipslicesorted1 = (slicesorted1 << 11) + flip1
+                    fs1_classsym = sy.flipslicesorted_classsym[flipslicesorted1]
+                    fs1_classidx = fs1_classsym >> 4
+                    fs1_sym = fs1_classsym & 15
+                    twist1 = sy.twist_conj[(twist1 << 4) + fs1_sym]
+                    udcorners1 = sy.udcorners_conj[(udcorners1 << 4) + fs1_sym]
+                    idx1 = 2187 * fs1_classidx + twist1  # defs.N_TWIST = 2187
+                    if not backsearch:
+                        if get_fsstc_depth3(udcorners1, idx1) == 3:  # entry not yet filled
+                            if fills is None or udcorners1 == udcorners:
+                                set_fsstc_depth3(udcorners1, idx1, (depth + 1) % 3)
+                                done += 1
+                            else:
+                                fills.add(udcorners1, idx1)
+                            # ####symmetric position has eventually more than one representation ###############
+                            sym = fs_sym[fs1_classidx]
+                            if sym != 1:
+                                for k in range(1, 16):
+                                    sym >>= 1
+                                    if sym % 2 == 1:
+                                        twist2 = sy.twist_conj[(twist1 << 4) + k]
+                                        udcorners2 = sy.udcorners_conj[(udcorners1 << 4) + k]
+                                        # fs2_classidx = fs1_classidx due to symmetry
+                                        idx2 = 2187 * fs1_classidx + twist2
+                                        if get_fsstc_depth3(udcorners2, idx2) == 3:
+                                            if fills is None or udcorners2 == udcorners:
+                                                set_fsstc_depth3(udcorners2, idx2, (depth + 1) % 3)
+                                                done += 1
+                                            else:
+                                                fills.add(udcorners2, idx2)
+                            ####################################################################################
+
+                    else:  # backwards search, only this process writes into slice udcorners
+                        if get_fsstc_depth3(udcorners1, idx1) == depth3:
+                            set_fsstc_depth3(udcorners, idx, (depth + 1) % 3)
+                            done += 1
+                            break
+            twist += 1
+            idx += 1  # idx = defs.N_TWIST * fs_class + twist
+    if end == defs.N_FLIPSLICESORTED_CLASS:
+        print()
+    return done
+
+
+def expand_bigprun_worker(args):
+    """Pool worker for the parallel table creation. The tables and fs_sym are inherited from the parent by fork."""
+    udcorners, depth, backsearch, fname, start, end = args
+    if backsearch:  # only the entries of slice udcorners are set
+        return expand_bigprun_slice(udcorners, depth, backsearch, shared_fs_sym, start, end=end)
+    fills = SliceFills(fname, udcorners)
+    done = expand_bigprun_slice(udcorners, depth, backsearch, shared_fs_sym, start, fills=fills, end=end)
+    fills.close()
+    return done
+
+
+def apply_bigprun_worker(args):
+    """Pool worker which sets the entries of slice udcorners found by the other workers in a round of the forward
+    step."""
+    udcorners, depth, fname = args
+    return apply_bigprun_fills(fname, udcorners, (depth + 1) % 3)
+
+
+def save_bigprun_checkpoint(fname, tables, state):
+    """Save the tables under construction and the state of the breadth first search. The new checkpoint is written
+    completely before it replaces the previous one."""
+    state['crc'] = []
+    for i in range(defs.N_UDCORNERS):
+        fh = open(fname + str(i) + '.ckpt.new', 'wb')
+        fh.write(tables[i])
+        fh.close()
+        state['crc'].append(zlib.crc32(tables[i]))
+    state['total'] = defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST
+    fh = open(fname + '.ckpt.new', 'w')
+    json.dump(state, fh)
+    fh.close()
+    for i in range(defs.N_UDCORNERS):
+        os.replace(fname + str(i) + '.ckpt.new', fname + str(i) + '.ckpt')
+    os.replace(fname + '.ckpt.new', fname + '.ckpt')
+
+
+def load_bigprun_checkpoint(fname, tables):
+    """Read a checkpoint into the preallocated tables. Returns the saved state of the breadth first search or None if
+    there is no checkpoint or if the checkpoint does not match its checksums."""
+    if not path.isfile(fname + '.ckpt'):
+        return None
+    fh = open(fname + '.ckpt')
+    state = json.load(fh)
+    fh.close()
+    if state['total'] != defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST:
+        print('checkpoint ' + fname + '.ckpt belongs to a different table, ignored')
+        return None
+    print('resuming from checkpoint ' + fname + '.ckpt' + ' at depth ' + str(state['depth']) + '...')
+    for i in range(defs.N_UDCORNERS):
+        buf = memoryview(tables[i]).cast('B')
+        if not path.isfile(fname + str(i) + '.ckpt') or path.getsize(fname + str(i) + '.ckpt') != len(buf):
+            print('checkpoint file ' + fname + str(i) + '.ckpt is missing or has the wrong size, ignored')
+            return None
+        fh = open(fname + str(i) + '.ckpt', 'rb')
+        fh.readinto(buf)
+        fh.close()
+        if zlib.crc32(buf) != state['crc'][i]:
+            print('checksum error in ' + fname + str(i) + '.ckpt, checkpoint ignored')
+            return None
+    return state
+
+
+def checkpoint_space(fname, tables):
+    """Check if the disk of the table files has room for the checkpoints. A checkpoint is written completely before it
+    replaces the previous one and the finished tables are written while the last checkpoint still exists, so two copies
+    of the tables must fit on the disk. Returns False and prints a message if they do not fit."""
+    size = sum(len(t) * t.itemsize for t in tables)
+    saved = 0  # the disk space of an existing checkpoint is already used
+    for i in range(defs.N_UDCORNERS):
+        if path.isfile(fname + str(i) + '.ckpt'):
+            saved += path.getsize(fname + str(i) + '.ckpt')
+    free = shutil.disk_usage(path.dirname(path.abspath(fname))).free
+    if free < 2 * size - saved:
+        print('only ' + str(free >> 20) + ' MB free disk space, the checkpoints need ' + str((2 * size - saved) >> 20)
+              + ' MB. The tables are created without checkpoints.')
+        return False
+    return True
+
+
+def remove_bigprun_checkpoint(fname):
+    for i in range(defs.N_UDCORNERS):
+        if path.isfile(fname + str(i) + '.ckpt'):
+            os.remove(fname + str(i) + '.ckpt')
+    if path.isfile(fname + '.ckpt'):
+        os.remove(fname + '.ckpt')
+
+
+def alloc_shared_slice(n):
+    """Allocate an array of n 'L' entries with value 0xffffffff in anonymous shared memory. The memory is not copied
+    when the process forks, so all workers of the pool see the same table."""
+    itemsize = ar.array('L').itemsize
+    mm = mmap.mmap(-1, n * itemsize)
+    chunk = ar.array('L', [0xffffffff] * 65536).tobytes()
+    for i in range(0, n * itemsize, len(chunk)):
+        mm.write(chunk[:n * itemsize - i])
+    return memoryview(mm).cast('L')
+
+
+def create_bigprun_table_numpy(fname):
+    """Create the phase1x24x35_prun files with NumPy. Each step of the breadth first search is done with whole-array
+    operations on chunks of the table instead of a Python loop over the entries, so the table creation also takes
+    reasonable time with CPython. The files are identical to the files created by createbigprun_table."""
+    import numpy as np  # only needed for this way of table creation
+
+    total = defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST
+    totalx35 = total * defs.N_UDCORNERS
+    nwords = total // 16 + 1
+    wt = np.dtype('L')  # same item type as array('L')
+    print("creating " + fname + " tables with NumPy...")
+    tab = np.full((defs.N_UDCORNERS, nwords), 0xffffffff, dtype=wt)
+    flat = tab.reshape(-1)
+
+    fs_sym = np.asarray(create_fs_sym_table()).astype(np.int64)
+    twist_move = np.asarray(mv.twist_move).astype(np.int64)
+    udcorners_move = np.asarray(mv.udcorners_move).astype(np.int64)
+    flip_move = np.asarray(mv.flip_move).astype(np.int64)
+    slice_sorted_move = np.asarray(mv.slice_sorted_move).astype(np.int64)
+    fs_classsym = np.asarray(sy.flipslicesorted_classsym)  # large, so the gathered values are cast later
+    fs_rep = np.asarray(sy.flipslicesorted_rep).astype(np.int64)
+    twist_conj = np.asarray(sy.twist_conj).astype(np.int64)
+    udcorners_conj = np.asarray(sy.udcorners_conj).astype(np.int64)
+
+    def get(keys):
+        """Table values of the entries with keys udcorners * total + idx."""
+        cn = keys // total
+        ix = keys - cn * total
+        return (flat[cn * nwords + (ix >> 4)] >> ((ix & 15) << 1).astype(wt)) & 3
+
+    def fill(keys, value):
+        """Set the unfilled entries with the given unique and sorted keys to value."""
+        cn = keys // total
+        ix = keys - cn * total
+        wi = cn * nwords + (ix >> 4)
+        mask = ~(wt.type(3 ^ value) << ((ix & 15) << 1).astype(wt))
+        starts = np.flatnonzero(np.concatenate(([True], wi[1:] != wi[:-1])))  # several entries may share a word
+        flat[wi[starts]] &= np.bitwise_and.reduceat(mask, starts)
+
+    def neighbors(cn, cls, twist, m):
+        """Keys of the neighbors of the entries (cn, cls, twist) for move m and the classes of the neighbors."""
+        rep = fs_rep[cls]
+        twist1 = twist_move[18 * twist + m]
+        udcorners1 = udcorners_move[18 * cn + m]
+        fs1 = (slice_sorted_move[18 * (rep >> 11) + m] << 11) + flip_move[18 * (rep & 2047) + m]
+        classsym1 = fs_classsym[fs1].astype(np.int64)
+        cls1 = classsym1 >> 4
+        sym1 = classsym1 & 15
+        twist1 = twist_conj[(twist1 << 4) + sym1]
+        udcorners1 = udcorners_conj[(udcorners1 << 4) + sym1]
+        return udcorners1, cls1, twist1
+
+    chunk = 1024 * defs.N_TWIST  # number of entries handled at once, a multiple of N_TWIST
+    state = None
+    if defs.CHECKPOINT:
+        state = load_bigprun_checkpoint(fname, tab)
+    checkpoints = defs.CHECKPOINT and checkpoint_space(fname, tab)
+    if state is None:
+        flat[0] = 0xfffffffc  # solved position has depth 0
+        state = {'depth': 0, 'done': 1, 'backsearch': False}
+    done = state['done']
+    depth = state['depth']
+    backsearch = state['backsearch']
+    print('depth:', depth, 'done: ' + str(done) + '/' + str(totalx35))
+    while done != totalx35:
+        depth3 = depth % 3
+        if depth == 11:
+            # backwards search is faster for depth >= 11
+            print('flipping to backwards search...')
+            backsearch = True
+
+        for udcorners in range(defs.N_UDCORNERS):
+            for start in range(0, total, chunk):
+                if (start // chunk + 1) % 20 == 0:
+                    print('.', end='', flush=True)
+                end = min(start + chunk, total)
+                if not backsearch and (tab[udcorners, start >> 4:((end - 1) >> 4) + 1] == 0xffffffff).all():
+                    continue  # nothing populated yet
+                e = np.arange(start, end, dtype=np.int64)
+                v = get(udcorners * total + e)
+
+                if not backsearch:
+                    e = e[v == depth3]
+                    if e.size == 0:
+                        continue
+                    cls = e // defs.N_TWIST
+                    twist = e - cls * defs.N_TWIST
+                    for m in enums.Move:
+                        udcorners1, cls1, twist1 = neighbors(udcorners, cls, twist, m)
+                        keys = [udcorners1 * total + defs.N_TWIST * cls1 + twist1]
+                        # ####symmetric position has eventually more than one representation ###################
+                        sym = fs_sym[cls1]
+                        for k in range(1, 16):
+                            s = np.flatnonzero((sym >> k) & 1)
+                            if s.size > 0:
+                                keys.append(udcorners_conj[(udcorners1[s] << 4) + k] * total + defs.N_TWIST * cls1[s]
+                                            + twist_conj[(twist1[s] << 4) + k])
+                        keys = np.unique(np.concatenate(keys))
+                        keys = keys[get(keys) == 3]  # entries not yet filled
+                        if keys.size > 0:
+                            fill(keys, (depth + 1) % 3)
+                            done += keys.size
+
+                else:  # backwards search
+                    e = e[v == 3]
+                    if e.size == 0:
+                        continue
+                    found = np.zeros(e.size, dtype=bool)
+                    for m in enums.Move:
+                        todo = np.flatnonzero(~found)
+                        if todo.size == 0:
+                            break
+                        cls = e[todo] // defs.N_TWIST
+                        udcorners1, cls1, twist1 = neighbors(udcorners, cls, e[todo] - cls * defs.N_TWIST, m)
+                        v1 = get(udcorners1 * total + defs.N_TWIST * cls1 + twist1)
+                        found[todo[v1 == depth3]] = True
+                    keys = udcorners * total + e[found]
+                    if keys.size > 0:
+                        fill(keys, (depth + 1) % 3)
+                        done += keys.size
+            print()
+
+        depth += 1
+        print()
+        print('depth:', depth, 'done: ' + str(done) + '/' + str(totalx35))
+        if checkpoints and done != totalx35:
+            save_bigprun_checkpoint(fname, tab, {'depth': depth, 'done': done, 'backsearch': backsearch,
+                                                 'udcorners': 0, 'fs_classidx': 0})
+
+    for i in range(defs.N_UDCORNERS):
+        fh = open(fname + str(i), "wb")
+        tab[i].tofile(fh)
+        fh.close()
+    remove_bigprun_checkpoint(fname)
+
+
 def createbigprun_table():
     """Create/load the flipslicesorted_twist_depth3 pruning table, 24x35 the phase1 table."""
-    global fsstc_depth3
+    global fsstc_depth3, shared_fs_sym
     total = defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST
     totalx35 = total * defs.N_UDCORNERS
-    fname = "phase1x24x35_prun"  # Überprüfundg der Teile
+    fname = tb.table_path("phase1x24x35_prun")  # Überprüfundg der Teile
+    fname3 = tb.table_path("phase1x24x35_prun3_")  # 5 entries per byte
+
+    if defs.PRUN_LAYOUT == 'inner':
+        if defs.PRUN_BACKEND == 'cache' or defs.PRUN_BASE3:
+            raise ValueError("PRUN_LAYOUT = 'inner' needs the 'array' or 'mmap' backend and PRUN_BASE3 = False")
+        if load_bigprun_table_inner():
+            return
+    elif load_bigprun_bundle():
+        return
+
+    if defs.PRUN_BASE3 and all(path.isfile(fname3 + str(i)) for i in range(defs.N_UDCORNERS)):
+        load_bigprun_table_base3(fname3)
+        return
+
+    if defs.PRUN_LAYOUT == 'inner':  # fail before the tables are created or loaded
+        numpy_for_conversion("phase1x35x24_prun (PRUN_LAYOUT = 'inner')")
+    elif defs.PRUN_BASE3:
+        numpy_for_conversion('phase1x24x35_prun3 (PRUN_BASE3 = True)')
 
     filesThere = True
     for i in range(defs.N_UDCORNERS):
@@ -43,122 +568,104 @@ def createbigprun_table():
             filesThere = False
             break
 
+    if not filesThere and defs.TABLE_NUMPY:
+        create_bigprun_table_numpy(fname)
+        filesThere = True
+
     if not filesThere:
         print("creating " + fname + " tables...")
         # print('This may take 8 hours or even longer, depending on the hardware and the Python version.')
         # print('Using PyPy instead of CPython gives a table creation speedup by a factor of about 20.')
+        workers = defs.TABLE_WORKERS
         for i in range(defs.N_UDCORNERS):
             print('Reserve 795 MB memory block ' + str(i))
-            fsstc_depth3[i] = ar.array('L', [0xffffffff] * (total // 16 + 1))
+            if workers > 1:
+                fsstc_depth3[i] = alloc_shared_slice(total // 16 + 1)
+            else:
+                fsstc_depth3[i] = ar.array('L', [0xffffffff] * (total // 16 + 1))
 
-        # #################### create table with the symmetries of the flipslicesorted classes #########################
-        cc = cb.CubieCube()
-        fs_sym = ar.array('L', [0] * defs.N_FLIPSLICESORTED_CLASS)
-        for i in range(defs.N_FLIPSLICESORTED_CLASS):
-            if (i + 1) % 24000 == 0:
-                print('.', end='', flush=True)
-            rep = sy.flipslicesorted_rep[i]
-            cc.set_slice_sorted(rep // defs.N_FLIP)
-            cc.set_flip(rep % defs.N_FLIP)
-
-            for s in range(defs.N_SYM_D4h):
-                ss = cb.CubieCube(sy.symCube[s].cp, sy.symCube[s].co, sy.symCube[s].ep,
-                                  sy.symCube[s].eo)  # copy cube
-                ss.edge_multiply(cc)  # s*cc
-                ss.edge_multiply(sy.symCube[sy.inv_idx[s]])  # s*cc*s^-1
-                if ss.get_slice_sorted() == rep // defs.N_FLIP and ss.get_flip() == rep % defs.N_FLIP:
-                    fs_sym[i] |= 1 << s
-        print()
-        # ##################################################################################################################
+        fs_sym = create_fs_sym_table()
+        pool = None
+        if workers > 1:
+            ctx = mp.get_context('fork')  # the workers must inherit the tables and not load them again
+            shared_fs_sym = fs_sym
+            remove_bigprun_fills(fname)
+            pool = ctx.Pool(workers)
+            print('using ' + str(workers) + ' processes')
 
-        fs_classidx = 0  # value for solved phase1x24x35
-        twist = 0
-        udcorners = 0
-        set_fsstc_depth3(udcorners, defs.N_TWIST * fs_classidx + twist, 0)
-        done = 1
-        depth = 0
-        backsearch = False
+        state = None
+        if defs.CHECKPOINT:
+            state = load_bigprun_checkpoint(fname, fsstc_depth3)
+        checkpoints = defs.CHECKPOINT and checkpoint_space(fname, fsstc_depth3)
+        if state is None:
+            fs_classidx = 0  # value for solved phase1x24x35
+            twist = 0
+            udcorners = 0
+            set_fsstc_depth3(udcorners, defs.N_TWIST * fs_classidx + twist, 0)
+            state = {'depth': 0, 'done': 1, 'backsearch': False, 'udcorners': 0, 'fs_classidx': 0}
+        done = state['done']
+        depth = state['depth']
+        backsearch = state['backsearch']
+        start_udcorners = state['udcorners']  # position within the depth where the search continues
+        start_fs_classidx = state['fs_classidx']
         print('depth:', depth, 'done: ' + str(done) + '/' + str(totalx35))
         while done != totalx35:
-            depth3 = depth % 3
             if depth == 11:
                 # backwards search is faster for depth >= 11
                 print('flipping to backwards search...')
                 backsearch = True
 
-            for udcorners in range(defs.N_UDCORNERS):
-                idx = 0
-                for fs_classidx in range(defs.N_FLIPSLICESORTED_CLASS):
-                    if (fs_classidx + 1) % 20000 == 0:
-                        print('.', end='', flush=True)
-
-                    twist = 0
-                    while twist < defs.N_TWIST:
-                        # ########## if table entries are not populated, this is very fast: ############################
-                        if not backsearch and idx % 16 == 0 and fsstc_depth3[udcorners][idx // 16] == 0xffffffff \
-                                and twist < defs.N_TWIST - 16:
-                            twist += 16
-                            idx += 16
-                            continue
-                        ################################################################################################
-
-                        if backsearch:
-                            match = (get_fsstc_depth3(udcorners, idx) == 3)
-                        else:
-                            match = (get_fsstc_depth3(udcorners, idx) == depth3)
-
-                        if match:
-                            flipslicesorted = sy.flipslicesorted_rep[fs_classidx]
-                            flip = flipslicesorted % 2048  # defs.N_FLIP = 2048
-                            slicesorted = flipslicesorted >> 11  # // defs.N_FLIP
-                            for m in enums.Move:
-                                twist1 = mv.twist_move[18 * twist + m]  # defs.N_MOVE = 18
-                                udcorners1 = mv.udcorners_move[18 * udcorners + m]
-                                flip1 = mv.flip_move[18 * flip + m]
-                                slicesorted1 = mv.slice_sorted_move[18 * slicesorted + m]
-                                flipslicesorted1 = (slicesorted1 << 11) + flip1
-                                fs1_classidx = sy.flipslicesorted_classidx[flipslicesorted1]
-                                fs1_sym = sy.flipslicesorted_sym[flipslicesorted1]
-                                twist1 = sy.twist_conj[(twist1 << 4) + fs1_sym]
-                                udcorners1 = sy.udcorners_conj[(udcorners1 << 4) + fs1_sym]
-                                idx1 = 2187 * fs1_classidx + twist1  # defs.N_TWIST = 2187
-                                if not backsearch:
-                                    if get_fsstc_depth3(udcorners1, idx1) == 3:  # entry not yet filled
-                                        set_fsstc_depth3(udcorners1, idx1, (depth + 1) % 3)
-                                        done += 1
-                                        # ####symmetric position has eventually more than one representation ###########
-                                        sym = fs_sym[fs1_classidx]
-                                        if sym != 1:
-                                            for k in range(1, 16):
-                                                sym >>= 1
-                                                if sym % 2 == 1:
-                                                    twist2 = sy.twist_conj[(twist1 << 4) + k]
-                                                    udcorners2 = sy.udcorners_conj[(udcorners1 << 4) + k]
-                                                    # fs2_classidx = fs1_classidx due to symmetry
-                                                    idx2 = 2187 * fs1_classidx + twist2
-                                                    if get_fsstc_depth3(udcorners2, idx2) == 3:
-                                                        # set_flipslicesorted_twist_depth3(idx2, (depth + 1) % 3)
-                                                        set_fsstc_depth3(udcorners2, idx2, (depth + 1) % 3)
-                                                        done += 1
-                                        ################################################################################
-
-                                else:  # backwards search
-                                    if get_fsstc_depth3(udcorners1, idx1) == depth3:
-                                        set_fsstc_depth3(udcorners, idx, (depth + 1) % 3)
-                                        done += 1
-                                        break
-                        twist += 1
-                        idx += 1  # idx = defs.N_TWIST * fs_class + twist
+            if pool is None:
+                for udcorners in range(start_udcorners, defs.N_UDCORNERS):
+                    checkpoint = None
+                    if checkpoints and defs.CHECKPOINT_CLASSES > 0:
+                        def checkpoint(fs_classidx, done_slice, u=udcorners, done_before=done):
+                            save_bigprun_checkpoint(fname, fsstc_depth3, {
+                                'depth': depth, 'done': done_before + done_slice, 'backsearch': backsearch,
+                                'udcorners': u, 'fs_classidx': fs_classidx})
+                    done += expand_bigprun_slice(udcorners, depth, backsearch, fs_sym, start_fs_classidx, checkpoint)
+                    start_fs_classidx = 0
+                start_udcorners = 0
+            elif backsearch:  # each slice is a task, all tasks of a depth are finished before the next depth starts
+                tasks = [(udcorners, depth, backsearch, fname, 0, defs.N_FLIPSLICESORTED_CLASS)
+                         for udcorners in range(defs.N_UDCORNERS)]
+                done += sum(pool.map(expand_bigprun_worker, tasks, chunksize=1))
+            else:  # the forward step is done in rounds of FILL_ROUND_CLASSES classes which bound the fill files
+                for start in range(0, defs.N_FLIPSLICESORTED_CLASS, FILL_ROUND_CLASSES):
+                    end = min(start + FILL_ROUND_CLASSES, defs.N_FLIPSLICESORTED_CLASS)
+                    tasks = [(udcorners, depth, backsearch, fname, start, end) for udcorners in range(defs.N_UDCORNERS)]
+                    done += sum(pool.map(expand_bigprun_worker, tasks, chunksize=1))
+                    # now the entries the tasks found for the other slices are set, again one task per slice
+                    tasks = [(udcorners, depth, fname) for udcorners in range(defs.N_UDCORNERS)]
+                    done += sum(pool.map(apply_bigprun_worker, tasks, chunksize=1))
                 print()
 
             depth += 1
             print()
             print('depth:', depth, 'done: ' + str(done) + '/' + str(totalx35))
+            if checkpoints and done != totalx35:
+                save_bigprun_checkpoint(fname, fsstc_depth3, {'depth': depth, 'done': done, 'backsearch': backsearch,
+                                                              'udcorners': 0, 'fs_classidx': 0})
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+            shared_fs_sym = None
 
         for i in range(defs.N_UDCORNERS):
             fh = open(fname + str(i), "wb")
-            fsstc_depth3[i].tofile(fh)
+            fh.write(fsstc_depth3[i])  # same bytes as array.tofile, also for the shared memory slices
             fh.close()
+        remove_bigprun_checkpoint(fname)
+        if defs.PRUN_BACKEND == 'mmap':
+            map_bigprun_table(fname)  # release the private copy of the tables
+        elif defs.PRUN_BACKEND == 'cache' and not defs.PRUN_BASE3:
+            open_bigprun_cache(fname, 'L')
+    elif defs.PRUN_BACKEND == 'mmap' or defs.PRUN_BASE3 or defs.PRUN_LAYOUT == 'inner':
+        # for the conversion to base 3 or to the inner layout the mapping is sufficient
+        map_bigprun_table(fname)
+    elif defs.PRUN_BACKEND == 'cache':
+        open_bigprun_cache(fname, 'L')
     else:
         for i in range(defs.N_UDCORNERS):
             print("loading " + fname + str(i) + " table...")
@@ -167,13 +674,202 @@ def createbigprun_table():
             fsstc_depth3[i].fromfile(fh, total // 16 + 1)
             fh.close()
 
+    if defs.PRUN_LAYOUT == 'inner':
+        convert_bigprun_table_inner()
+        load_bigprun_table_inner()
+    elif defs.PRUN_BASE3:
+        convert_bigprun_table_base3(fname3)
+        load_bigprun_table_base3(fname3)
+
+
+def open_bigprun_cache(fname, typecode):
+    """Access the phase1x24x35_prun files through a block cache with a memory budget of PRUN_CACHE_MB megabytes.
+    typecode is 'L' for the tables with 16 entries per item and 'B' for the tables with 5 entries per byte."""
+    global prun_cache, get_fsstc_depth3
+    print("opening " + fname + " tables with a " + str(defs.PRUN_CACHE_MB) + " MB block cache...")
+    for i in range(defs.N_UDCORNERS):
+        fsstc_depth3[i] = ar.array(typecode)  # release tables which are still in memory
+    prun_cache = BlockCache([fname + str(i) for i in range(defs.N_UDCORNERS)], typecode, defs.PRUN_CACHE_BLOCK,
+                            defs.PRUN_CACHE_MB << 20)
+    if typecode == 'L':
+        get_fsstc_depth3 = get_fsstc_depth3_cache
+    else:
+        get_fsstc_depth3 = get_fsstc_depth3_base3_cache
+
+
+def load_bigprun_bundle():
+    """Use the phase1x24x35_prun tables of the table bundle if the bundle contains them. Returns False otherwise."""
+    global get_fsstc_depth3, prun_cache
+    name = "phase1x24x35_prun3_" if defs.PRUN_BASE3 else "phase1x24x35_prun"
+    size = (defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST + 4) // 5 if defs.PRUN_BASE3 \
+        else defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST // 16 + 1
+    tables = [tb.section(name + str(i)) for i in range(defs.N_UDCORNERS)]
+    if None in tables:
+        return False
+    for t in tables:
+        if len(t) != size:
+            raise ValueError('table ' + name + ' in the bundle does not have ' + str(size) + ' items')
+    if defs.PRUN_BACKEND == 'cache':
+        typecode = 'B' if defs.PRUN_BASE3 else 'L'
+        print("opening " + name + " tables of the bundle with a " + str(defs.PRUN_CACHE_MB) + " MB block cache...")
+        prun_cache = BlockCache([tb.bundle.fname] * defs.N_UDCORNERS, typecode, defs.PRUN_CACHE_BLOCK,
+                                defs.PRUN_CACHE_MB << 20, [tb.bundle.sections[name + str(i)][2]
+                                                           for i in range(defs.N_UDCORNERS)])
+        get_fsstc_depth3 = get_fsstc_depth3_base3_cache if defs.PRUN_BASE3 else get_fsstc_depth3_cache
+        return True
+    for i in range(defs.N_UDCORNERS):
+        fsstc_depth3[i] = tables[i]
+    if defs.PRUN_BASE3:
+        get_fsstc_depth3 = get_fsstc_depth3_base3
+    return True
+
+
+def map_bigprun_table(fname):
+    """Map the phase1x24x35_prun files read-only into memory. get_fsstc_depth3 reads directly from the mappings, so
+    nothing is copied and all processes which map the same files share one physical copy in the page cache."""
+    size = (defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST // 16 + 1) * ar.array('L').itemsize
+    for i in range(defs.N_UDCORNERS):
+        print("mapping " + fname + str(i) + " table...")
+        fh = open(fname + str(i), "rb")
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        fh.close()  # the mapping stays valid after the file is closed
+        if len(mm) != size:
+            raise ValueError('Table ' + fname + str(i) + ' has ' + str(len(mm)) + ' bytes instead of ' + str(size))
+        if hasattr(mmap, 'MADV_RANDOM'):
+            mm.madvise(mmap.MADV_RANDOM)  # the search probes the table randomly, readahead only wastes I/O
+        fsstc_depth3[i] = memoryview(mm).cast('L')
+
+
+def numpy_for_conversion(target):
+    """Return the NumPy module for the conversion of the phase1x24x35_prun tables to target. In pure Python the
+    conversion would handle the 1.2e11 table entries one by one and take more than a day with CPython, so it is only
+    done with NumPy."""
+    try:
+        import numpy as np  # only needed for the conversions of the table
+    except ImportError:
+        raise ImportError('The conversion of the phase1x24x35_prun tables to ' + target + ' needs NumPy, which is '
+                          'also used for TABLE_NUMPY = True. Install NumPy or change the table settings in defs.py.') \
+            from None
+    return np
+
+
+def convert_bigprun_table_base3(fname3):
+    """Convert the loaded phase1x24x35_prun tables with 16 entries per 32 bit to files with 5 entries per byte. The 2
+    bit entries of a chunk of words are unpacked with NumPy and each group of 5 entries is combined with the weights
+    3**k into one byte."""
+    np = numpy_for_conversion('phase1x24x35_prun3 (PRUN_BASE3 = True)')
+    total = defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST
+    n_words = total // 16 + 1
+    chunk = 5 << 16  # words per step, 16 * chunk entries give whole bytes
+    wt = np.dtype('L')  # same item type as array('L')
+    shifts = np.arange(0, 32, 2, dtype=wt)
+    weights = 3 ** np.arange(5, dtype=np.uint8)
+    for i in range(defs.N_UDCORNERS):
+        print("creating " + fname3 + str(i) + " table...")
+        fh = open(fname3 + str(i), "wb")
+        for k in range(0, n_words, chunk):
+            entries = ((np.asarray(fsstc_depth3[i][k:k + chunk], dtype=wt)[:, None] >> shifts) & 3).astype(np.uint8)
+            entries = entries.reshape(-1)[:total - 16 * k]  # the entries behind the last one are no table entries
+            if entries.size % 5 != 0:
+                entries = np.concatenate((entries, np.zeros(5 - entries.size % 5, dtype=np.uint8)))
+            (entries.reshape(-1, 5) @ weights).astype(np.uint8).tofile(fh)
+        fh.close()
+
+
+def load_bigprun_table_base3(fname3):
+    """Load or map the phase1x24x35_prun tables with 5 entries per byte and use the matching get_fsstc_depth3."""
+    global get_fsstc_depth3
+    size = (defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST + 4) // 5
+    for i in range(defs.N_UDCORNERS):
+        print("loading " + fname3 + str(i) + " table...")
+        fh = open(fname3 + str(i), "rb")
+        if defs.PRUN_BACKEND == 'cache':
+            fsstc_depth3[i] = ar.array('B')  # not used, the entries are read by prun_cache
+            fh.close()
+            continue
+        if defs.PRUN_BACKEND == 'mmap':
+            fsstc_depth3[i] = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_RANDOM'):
+                fsstc_depth3[i].madvise(mmap.MADV_RANDOM)
+        else:
+            fsstc_depth3[i] = bytearray(size)
+            fh.readinto(fsstc_depth3[i])
+        fh.close()
+        if len(fsstc_depth3[i]) != size or path.getsize(fname3 + str(i)) != size:
+            raise ValueError('Table ' + fname3 + str(i) + ' does not have ' + str(size) + ' bytes')
+    if defs.PRUN_BACKEND == 'cache':
+        open_bigprun_cache(fname3, 'B')
+    else:
+        get_fsstc_depth3 = get_fsstc_depth3_base3
+
+
+def convert_bigprun_table_inner():
+    """Write the loaded phase1x24x35_prun tables to one table phase1x35x24_prun with udcorners as inner dimension.
+    Entry (N_TWIST * fs_classidx + twist) * N_UDCORNERS + udcorners of the new table is entry N_TWIST * fs_classidx +
+    twist of the table udcorners. The tables are converted with NumPy in blocks of 64 K words of each table."""
+    fname = tb.table_path("phase1x35x24_prun")
+    n_words = defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST // 16 + 1  # words of one table, all entries are copied
+    chunk = 1 << 16  # words of each table per step
+    np = numpy_for_conversion("phase1x35x24_prun (PRUN_LAYOUT = 'inner')")
+    wt = np.dtype('L')  # same item type as array('L')
+    shifts = np.arange(0, 32, 2, dtype=wt)
+    print("creating " + fname + " table...")
+    fh = open(fname + '.tmp', 'wb')
+    for k in range(0, n_words, chunk):
+        if k % (chunk << 8) == 0:
+            print('.', end='', flush=True)
+        tab = np.stack([np.asarray(fsstc_depth3[cn][k:k + chunk], dtype=wt) for cn in range(defs.N_UDCORNERS)])
+        entries = (tab[:, :, None] >> shifts) & 3  # [udcorners, word, entry within word]
+        entries = entries.transpose(1, 2, 0).reshape(-1, 16)  # in the order of the new table
+        np.bitwise_or.reduce(entries << shifts, axis=1).tofile(fh)
+    fh.close()
+    print()
+    os.replace(fname + '.tmp', fname)
+
+
+def load_bigprun_table_inner():
+    """Load or map the phase1x35x24_prun table and use get_fsstc_depth3_inner. Returns False if the table does not
+    exist yet."""
+    global fsstc_depth3_inner, get_fsstc_depth3
+    fname = tb.table_path("phase1x35x24_prun")
+    size = defs.N_UDCORNERS * (defs.N_FLIPSLICESORTED_CLASS * defs.N_TWIST // 16 + 1)
+    table = tb.section("phase1x35x24_prun")
+    if table is None:
+        if not path.isfile(fname):
+            return False
+        if path.getsize(fname) != size * ar.array('L').itemsize:
+            raise ValueError('Table ' + fname + ' does not have ' + str(size * ar.array('L').itemsize) +
+                             ' bytes. Delete it to create it again.')
+        for i in range(defs.N_UDCORNERS):
+            fsstc_depth3[i] = ar.array('L')  # release the tables with the other layout
+        fh = open(fname, "rb")
+        if defs.PRUN_BACKEND == 'mmap':
+            print("mapping " + fname + " table...")
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, 'MADV_RANDOM'):
+                mm.madvise(mmap.MADV_RANDOM)
+            table = memoryview(mm).cast('L')
+        else:
+            print("loading " + fname + " table...")
+            table = ar.array('L')
+            table.fromfile(fh, size)
+        fh.close()
+    elif len(table) != size:
+        raise ValueError('table phase1x35x24_prun in the bundle does not have ' + str(size) + ' items')
+    for i in range(defs.N_UDCORNERS):
+        fsstc_depth3[i] = ar.array('L')
+    fsstc_depth3_inner = table
+    get_fsstc_depth3 = get_fsstc_depth3_inner
+    return True
+
 
 def create_cornerprun_table():
     """Create/load the corner_depth pruning table. Entry gives the number of moves which are at least necessary
     to restore the corners."""
     fname = "cornerprun"
     global corner_depth
-    if not path.isfile(fname):
+    corner_depth = tb.load(fname, 'b', defs.N_CORNERS)
+    if corner_depth is None:
         print("creating " + fname + " table...")
         corner_depth = ar.array('b', [-1] * defs.N_CORNERS)
         corners = 0  # value for solved corners
@@ -193,14 +889,169 @@ def create_cornerprun_table():
 
             depth += 1
         print()
-        fh = open(fname, "wb")
-        corner_depth.tofile(fh)
-    else:
-        print("loading " + fname + " table...")
-        fh = open(fname, "rb")
-        corner_depth = ar.array('b')
-        corner_depth.fromfile(fh, defs.N_CORNERS)
-    fh.close()
+        tb.save(fname, corner_depth)
+
+
+def get_cornertwist_depth3(corners, twist):
+    """The distance mod 3 of the corner permutation and twist to the solved corners."""
+    cs = sy.corners_classsym[corners]
+    ix = 2187 * (cs >> 4) + sy.twist_conj[(twist << 4) + (cs & 15)]  # defs.N_TWIST = 2187
+    return (cornertwist_depth3[ix >> 4] >> ((ix & 15) << 1)) & 3
+
+
+def create_cornertwist_table():
+    """Create/load the cornertwist_depth3 pruning table with CORNER_TWIST_TABLE. The corner permutation is reduced by
+    the 16 symmetries of D4h to 2768 classes, an entry gives the distance mod 3 of a corners class and a twist to the
+    solved corners."""
+    global cornertwist_depth3
+    if not defs.CORNER_TWIST_TABLE or cornertwist_depth3 is not None:
+        return
+    fname = "cornertwist_prun"
+    total = defs.N_CORNERS_CLASS * defs.N_TWIST
+    cornertwist_depth3 = tb.load(fname, 'I', total // 16 + 1)
+    if cornertwist_depth3 is not None:
+        return
+    print("creating " + fname + " table...")
+    table = ar.array('I', [0xffffffff] * (total // 16 + 1))
+    twist_move = mv.twist_move
+    twist_conj = sy.twist_conj
+
+    # the symmetries which leave the representant of a class invariant and the classes of its 18 neighbors
+    co_sym = ar.array('H', [0] * defs.N_CORNERS_CLASS)
+    co_move = []
+    cc = cb.CubieCube()
+    for c in range(defs.N_CORNERS_CLASS):
+        rep = sy.corners_rep[c]
+        cc.set_corners(rep)
+        for s in range(defs.N_SYM_D4h):
+            ss = cb.CubieCube(sy.symCube[s].cp, sy.symCube[s].co, sy.symCube[s].ep, sy.symCube[s].eo)
+            ss.corner_multiply(cc)  # s*cc
+            ss.corner_multiply(sy.symCube[sy.inv_idx[s]])  # s*cc*s^-1
+            if ss.get_corners() == rep:
+                co_sym[c] |= 1 << s
+        co_move.append([(cs >> 4, cs & 15) for cs in
+                        (sy.corners_classsym[mv.corners_move[18 * rep + m]] for m in range(18))])
+
+    table[0] = 0xfffffffc  # solved corners have depth 0
+    done = 1
+    depth = 0
+    while done != total:
+        backsearch = depth >= 8  # most entries are filled then, looking for their neighbors is faster
+        depth3 = depth % 3
+        new3 = (depth + 1) % 3
+        for c in range(defs.N_CORNERS_CLASS):
+            if (c + 1) % 100 == 0:
+                print('.', end='', flush=True)
+            idx = 2187 * c  # defs.N_TWIST = 2187
+            for twist in range(2187):
+                ix = idx + twist
+                v = (table[ix >> 4] >> ((ix & 15) << 1)) & 3
+                if v != (3 if backsearch else depth3):
+                    continue
+                for m in range(18):
+                    c1, s1 = co_move[c][m]
+                    twist1 = twist_conj[(twist_move[18 * twist + m] << 4) + s1]
+                    ix1 = 2187 * c1 + twist1
+                    v1 = (table[ix1 >> 4] >> ((ix1 & 15) << 1)) & 3
+                    if backsearch:
+                        if v1 == depth3:
+                            table[ix >> 4] &= ~((3 - new3) << ((ix & 15) << 1)) & 0xffffffff
+                            done += 1
+                            break
+                    elif v1 == 3:
+                        table[ix1 >> 4] &= ~((3 - new3) << ((ix1 & 15) << 1)) & 0xffffffff
+                        done += 1
+                        sym = co_sym[c1]
+                        if sym != 1:  # symmetric position has eventually more than one representation
+                            for k in range(1, 16):
+                                if (sym >> k) & 1:
+                                    ix2 = 2187 * c1 + twist_conj[(twist1 << 4) + k]
+                                    if (table[ix2 >> 4] >> ((ix2 & 15) << 1)) & 3 == 3:
+                                        table[ix2 >> 4] &= ~((3 - new3) << ((ix2 & 15) << 1)) & 0xffffffff
+                                        done += 1
+        depth += 1
+        print()
+        print('depth:', depth, 'done: ' + str(done) + '/' + str(total))
+    tb.save(fname, table)
+    cornertwist_depth3 = table
+
+
+def create_edgeprun_table():
+    """Create/load the edge_depth pattern database with EDGE_TABLE. Entry gives the number of moves which are at least
+    necessary to restore the six edges UR, UF, UL, UB, DR and DF with their orientation."""
+    global edge_depth
+    if not defs.EDGE_TABLE or edge_depth is not None:
+        return
+    fname = "edges6_prun"
+    total = defs.N_EDGES6 * 64
+    edge_depth = tb.load(fname, 'B', total)
+    if edge_depth is not None:
+        return
+    if defs.TABLE_NUMPY:
+        edge_depth = create_edgeprun_table_numpy(fname)
+        tb.save(fname, edge_depth)
+        return
+    print("creating " + fname + " table...")
+    edges6_move = mv.edges6_move
+    table = bytearray(b'\xff') * total  # 255 for an empty entry
+    table[0] = 0  # value for solved edges
+    done = 1
+    depth = 0
+    while done != total:
+        backsearch = depth >= 8  # most entries are filled then, looking for their neighbors is faster
+        # bytearray.find gives the next entry to expand without a Python loop over the other entries
+        key = b'\xff' if backsearch else bytes([depth])
+        cnt = 0
+        idx = table.find(key)
+        while idx >= 0:
+            cnt += 1
+            if cnt % 500000 == 0:
+                print('.', end='', flush=True)
+            base = 18 * (idx >> 6)  # defs.N_MOVE = 18
+            ori = idx & 63
+            if backsearch:
+                for m in range(18):
+                    if table[edges6_move[base + m] ^ ori] == depth:
+                        table[idx] = depth + 1
+                        done += 1
+                        break
+            else:
+                for m in range(18):
+                    idx1 = edges6_move[base + m] ^ ori
+                    if table[idx1] == 255:
+                        table[idx1] = depth + 1
+                        done += 1
+            idx = table.find(key, idx + 1)
+        depth += 1
+        print()
+        print('depth:', depth, 'done: ' + str(done) + '/' + str(total))
+    edge_depth = ar.array('B', table)
+    tb.save(fname, edge_depth)
+
+
+def create_edgeprun_table_numpy(fname):
+    """Create the edge_depth pattern database with NumPy, one breadth first search step on chunks of the frontier at a
+    time. The table is identical to the table created by create_edgeprun_table."""
+    import numpy as np  # only needed for this way of table creation
+
+    total = defs.N_EDGES6 * 64
+    print("creating " + fname + " table with NumPy...")
+    edges6_move = np.asarray(mv.edges6_move).astype(np.int64).reshape(defs.N_EDGES6, defs.N_MOVE)
+    table = np.full(total, 255, dtype=np.uint8)
+    table[0] = 0
+    frontier = np.zeros(1, dtype=np.int64)
+    depth = 0
+    done = 1
+    while done != total:
+        for k in range(0, len(frontier), 1 << 20):
+            f = frontier[k:k + (1 << 20)]
+            idx1 = (edges6_move[f >> 6] ^ (f & 63)[:, None]).reshape(-1)
+            table[idx1[table[idx1] == 255]] = depth + 1
+        depth += 1
+        frontier = np.flatnonzero(table == depth)
+        done += len(frontier)
+        print('depth:', depth, 'done: ' + str(done) + '/' + str(total))
+    return ar.array('B', table.tobytes())
 
 
 # # array distance computes the new distance from the old_distance i and the new_distance_mod3 j. ######################
@@ -216,6 +1067,3 @@ for i in range(20):
             distance[3 * i + j] += 3
         elif i % 3 == 0 and j == 2:
             distance[3 * i + j] -= 3
-
-createbigprun_table()
-create_cornerprun_table()
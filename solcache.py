@@ -0,0 +1,134 @@
+# ################ Solution cache: repeated and symmetry equivalent cubes are solved only once #########################
+
+# A cube x, its conjugates s * x * s^-1 by the 48 symmetries s and the conjugates of its inverse have the same distance.
+# The cache reduces a cube to the representant with the smallest key of these 96 cubes and stores one optimal maneuver
+# of the representant, in memory for the most recently used cubes and optionally in a dbm file on disk.
+# If r = s * x * s^-1 is solved by the maneuver m1 m2 ... mn, x is solved by s^-1 * m1 * s ... s^-1 * mn * s.
+# If r = s * x^-1 * s^-1 is solved by m1 m2 ... mn, x is solved by the inverse maneuver s^-1 * mn^-1 * s ... of it.
+
+import dbm
+import threading
+from collections import OrderedDict
+import defs
+import face
+import cubie as cb
+import symmetries as sy
+import solver as sv
+from defs import N_MOVE, N_SYM
+from enums import Move as Mv
+
+
+def canonical(cc):
+    """The representant of the cubie cube cc under the symmetries and the inversion. Returns the key of the representant
+    (bytes), the symmetry s and True if the representant is a conjugate of the inverse of cc."""
+    ci = cb.CubieCube()
+    cc.inv_cubie_cube(ci)
+    best = None
+    for inv, c0 in ((False, cc), (True, ci)):
+        for s in range(N_SYM):
+            c = cb.CubieCube(sy.symCube[s].cp, sy.symCube[s].co, sy.symCube[s].ep, sy.symCube[s].eo)
+            c.multiply(c0)
+            c.multiply(sy.symCube[sy.inv_idx[s]])  # s * c0 * s^-1
+            key = bytes(c.cp + c.co + c.ep + c.eo)
+            if best is None or key < best[0]:
+                best = (key, s, inv)
+    return best
+
+
+def inverse_maneuver(moves):
+    """The inverse of a maneuver given as list of move numbers."""
+    return [m - m % 3 + 2 - m % 3 for m in reversed(moves)]
+
+
+def to_representant(moves, s, inv):
+    """Map a maneuver which solves the cube x to a maneuver which solves its representant, see canonical()."""
+    if inv:
+        moves = inverse_maneuver(moves)
+    return [sy.conj_move[N_MOVE * s + m] for m in moves]
+
+
+def from_representant(moves, s, inv):
+    """Map a maneuver which solves the representant back to a maneuver which solves the cube x, see canonical()."""
+    moves = [sy.conj_move[N_MOVE * sy.inv_idx[s] + m] for m in moves]
+    return inverse_maneuver(moves) if inv else moves
+
+
+class SolutionCache:
+    """Cache of optimal solutions in front of solver.solve(). The most recently used capacity representants are held in
+    memory, with fname all representants are also stored in the dbm file fname. A dbm file must not be opened by
+    several processes for writing, give each process its own file or use the cache only in one process."""
+
+    def __init__(self, fname=None, capacity=None):
+        self.capacity = defs.SOLUTION_CACHE_SIZE if capacity is None else capacity
+        self.entries = OrderedDict()  # key of the representant -> its maneuver, least recently used first
+        self.store = dbm.open(fname, 'c') if fname is not None else None
+        self.lock = threading.Lock()
+        self.hits = 0  # found in memory
+        self.disk_hits = 0  # found in the dbm file
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, cc):
+        """The maneuver which solves the cubie cube cc as list of move numbers or None if the cache does not have it."""
+        key, s, inv = canonical(cc)
+        with self.lock:
+            moves = self.entries.get(key)
+            if moves is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            elif self.store is not None and key in self.store:
+                self.disk_hits += 1
+                moves = list(self.store[key])
+                self.remember(key, moves)
+            else:
+                self.misses += 1
+                return None
+        return from_representant(moves, s, inv)
+
+    def put(self, cc, moves):
+        """Store the optimal maneuver moves (list of move numbers) which solves the cubie cube cc."""
+        key, s, inv = canonical(cc)
+        moves = to_representant(moves, s, inv)
+        with self.lock:
+            self.remember(key, moves)
+            if self.store is not None:
+                self.store[key] = bytes(moves)
+
+    def remember(self, key, moves):
+        """Put a representant into the memory part, the caller holds the lock."""
+        self.entries[key] = moves
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def solve(self, cubestring, workers=None, deadline=None, fallback=None):
+        """Same as solver.solve() but the solution is taken from the cache if the cube or a symmetric cube was solved
+        before. A SolveTimeout is returned as it is and not cached."""
+        fc = face.FaceCube()
+        s = fc.from_string(cubestring)
+        if s != cb.CUBE_OK:
+            return s
+        cc = fc.to_cubie_cube()
+        s = cc.verify()
+        if s != cb.CUBE_OK:
+            return s
+        moves = self.get(cc)
+        if moves is None:
+            s = sv.solve(cubestring, workers, deadline, fallback)
+            if isinstance(s, sv.SolveTimeout):
+                return s
+            moves = [Mv[name] for name in s[:s.rindex('(')].split()]
+            self.put(cc, moves)
+        return ''.join(Mv(m).name + ' ' for m in moves) + '(' + str(len(moves)) + 'f*)'
+
+    def stats(self):
+        """Counters of the cache."""
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'evictions': self.evictions,
+                'entries': len(self.entries), 'capacity': self.capacity}
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        self.entries.clear()
@@ -1,152 +1,743 @@
-# ################### The SolverThread class solves implements the two phase algorithm #################################
+# ################### The Solver class implements the optimal solver ###################################################
 import face
-from defs import N_MOVE, N_FLIP, N_TWIST
+from defs import N_MOVE, N_FLIP, N_TWIST, N_SYM
 import cubie
 import symmetries as sy
 import coord
 import enums as en
 import moves as mv
 import pruning as pr
+import endgame as eg
+import tables as tb
+import tableserver as ts
+import defs
+import threading
+import multiprocessing as mp
+import os
 import time
 
-solfound = False  # global variable, True if solution is found
-nodecount = 0  # number of nodes generated on certain level
-sofar = []
+POLL_NODES = 10000  # number of nodes between two checks whether the search has to be stopped
+SPLIT_PLIES = 2  # plies expanded by the parent process in a parallel solve, the workers search the subtrees
 
+# ############################## Explicit and lazy initialization of the tables #######################################
+# The tables are grouped into tiers which are loaded or created on demand: 'moves' (move tables), 'sym' (symmetry
+# tables), 'corner' (corner pruning table), 'cornertwist' (the pruning table of corners and twist, only with
+# CORNER_TWIST_TABLE), 'edges' (the edge pattern database, only with EDGE_TABLE), 'endgame' (the endgame tables, only
+# with ENDGAME_DEPTH > 0) and 'big' (the phase1x24x35_prun table).
+TIERS = ('moves', 'sym', 'corner', 'cornertwist', 'edges', 'endgame', 'big')
+tier_deps = {'moves': (), 'sym': (), 'corner': ('moves',), 'cornertwist': ('moves', 'sym'), 'edges': ('moves',),
+             'endgame': ('moves', 'sym'), 'big': ('moves', 'sym')}
+tier_init = {'moves': mv.init, 'sym': sy.init, 'corner': pr.create_cornerprun_table,
+             'cornertwist': pr.create_cornertwist_table, 'edges': pr.create_edgeprun_table,
+             'endgame': eg.create_endgame_table, 'big': pr.createbigprun_table}
+tier_locks = {t: threading.Lock() for t in TIERS}
+loaded = set()  # the tiers which are ready
+preload = None  # thread started by init(background=True)
 
-def search(UD_flip, RL_flip, FB_flip, UD_twist, RL_twist, FB_twist, UD_slice_sorted,
-           RL_slice_sorted, FB_slice_sorted, UDcorn, RLcorn, FBcorn, corners, UD_dist, RL_dist, FB_dist, togo):
-    global solfound, nodecount
 
-    if solfound:
-        return
-    if togo == 0:
-        if corners == 0:
-            solfound = True
+def load_tier(tier):
+    """Load the tables of a tier and of the tiers it depends on. Waits if another thread is loading them."""
+    if tier in loaded:
         return
+    for t in tier_deps[tier]:
+        load_tier(t)
+    with tier_locks[tier]:
+        if tier not in loaded:
+            if defs.TABLE_SHM:
+                ts.attach_tier(defs.TABLE_SHM, tier)
+            else:
+                tier_init[tier]()
+            loaded.add(tier)
 
-    else:
-        for m in en.Move:
 
-            if len(sofar) > 0:
-                diff = sofar[-1] // 3 - m // 3
-                if diff in [0, 3]:  # successive moves on same face or on same axis with wrong order
+def load_tiers(tiers):
+    """Load the tables of the given tiers."""
+    for t in tiers:
+        load_tier(t)
+
+
+def init(table_dir=None, tiers=TIERS, background=False):
+    """Load or create the tables of the given tiers. solve() calls it for all tiers if this has not been done before.
+    :param table_dir: The directory of the tables, TABLE_DIR in defs.py if None. It applies to tiers not loaded yet.
+    :param tiers: The tiers to load, see TIERS
+    :param background: If True the tiers are loaded by a daemon thread which is returned at once. Calls which need a
+     tier the thread has not finished yet wait for it.
+    """
+    global preload
+    for t in tiers:
+        if t not in TIERS:
+            raise ValueError('unknown table tier ' + str(t) + ', use one of ' + ', '.join(TIERS))
+    if table_dir is not None and table_dir != defs.TABLE_DIR:
+        defs.TABLE_DIR = table_dir
+        tb.bundle = None  # look for the bundle in the new directory
+    if background:
+        preload = threading.Thread(target=load_tiers, args=(tiers,), daemon=True)
+        preload.start()
+        return preload
+    load_tiers(tiers)
+########################################################################################################################
+
+
+class SolveTimeout:
+    """Result of a solve which reached its deadline before an optimal solution was found."""
+
+    def __init__(self, lower_bound, nodes, solution=None):
+        self.lower_bound = lower_bound  # the cube needs at least lower_bound moves, all shorter maneuvers are searched
+        self.nodes = nodes  # number of nodes generated until the deadline
+        self.solution = solution  # the result of the fallback or None
+
+    def __str__(self):
+        return 'Timeout: at least ' + str(self.lower_bound) + ' moves, ' + str(self.nodes) + ' nodes generated' + \
+            ('' if self.solution is None else ', fallback ' + str(self.solution))
+
+
+class Solver:
+    """Optimal solver which owns its search state. The tables are read-only and shared by all instances, so several
+    instances can solve cubes concurrently, for example in a thread pool."""
+
+    def __init__(self):
+        self.solfound = False  # True if solution is found
+        self.nodecount = 0  # number of nodes generated on certain level
+        self.totnodes = 0  # number of nodes generated by the last solve
+        self.sofar = []  # the moves of the potential solution maneuver
+        self.abort = None  # function polled every POLL_NODES nodes, the search stops if it returns True
+        self.aborted = False  # True if the search was stopped by abort
+        self.next_poll = POLL_NODES
+        self.edge_probes = 0  # nodes which reached the edge pattern database with EDGE_TABLE
+        self.edge_cutoffs = 0  # nodes cut only by the edge pattern database
+        self.inv = None  # with INVERSE_PRUNING the inverse positions of the nodes on the path, see inverse_child()
+        self.depth_nodes = {}  # depth -> number of nodes generated for this depth by the last solve
+        self.depth_edges = {}  # depth -> (edge_probes, edge_cutoffs) of this depth by the last solve with EDGE_TABLE
+        self.root_moves = None  # with a symmetric cube the moves to try at the first two plies, see find_root_moves()
+        self.deadline = None  # time.monotonic() value at which solve() stops the search
+        self.pool = None  # process pool of the parallel search, forked by the first solve with workers > 1
+        self.pool_workers = 0  # number of processes of the pool
+        self.stop = None  # event which stops the workers of the pool, see search_subtree()
+
+    def get_pool(self, workers):
+        """Return the process pool of the parallel search. It is forked by the first parallel solve and kept for the
+        following solves, only a different number of workers forks a new pool."""
+        if self.pool is not None and self.pool_workers != workers:
+            self.close()
+        if self.pool is None:
+            ctx = mp.get_context('fork')  # the workers inherit the tables
+            self.stop = ctx.Event()
+            self.pool = ctx.Pool(workers, initializer=init_worker, initargs=(self.stop,))
+            self.pool_workers = workers
+        return self.pool
+
+    def close(self):
+        """Terminate the process pool of the parallel search. A later parallel solve forks a new one."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+    def poll(self):
+        """Stop the search if abort() returns True."""
+        self.next_poll = self.nodecount + POLL_NODES
+        if self.abort is not None and self.abort():
+            self.aborted = True
+            self.solfound = True  # unwinds the search
+
+    @staticmethod
+    def find_root_moves(cc):
+        """If s is a symmetry of the cube cc, s * cc * s^-1 = cc, the move m and the move s * m * s^-1 lead to positions
+        with the same distance. So only the first move of each class of moves which the symmetries of cc map onto each
+        other is tried. At the second ply this holds for the symmetries which also map the first move onto itself.
+        Antisymmetries map the first moves of a solution onto the last ones and are not used. Returns None if cc has no
+        symmetry, else the moves to try at ply 0 and the list of the moves to try at ply 1 for each move at ply 0."""
+        syms = [s for s in cc.symmetries() if 0 < s < N_SYM]  # without the identity and the antisymmetries
+        if len(syms) == 0:
+            return None
+        first = [m for m in range(N_MOVE) if all(sy.conj_move[N_MOVE * s + m] >= m for s in syms)]
+        second = []
+        for m in range(N_MOVE):
+            stab = [s for s in syms if sy.conj_move[N_MOVE * s + m] == m]
+            second.append([m2 for m2 in range(N_MOVE) if m // 3 - m2 // 3 not in (0, 3) and
+                           all(sy.conj_move[N_MOVE * s + m2] >= m2 for s in stab)])
+        return first, second
+
+    @staticmethod
+    def inverse_views(cc):
+        """The cubie cube cc seen from the UD, RL and FB axis, the argument inv of inverse_child()."""
+        rl = cubie.CubieCube(sy.symCube[16].cp, sy.symCube[16].co, sy.symCube[16].ep, sy.symCube[16].eo)
+        rl.multiply(cc)
+        rl.multiply(sy.symCube[32])  # symCube[16]*cc*symCube[16]^-1
+        fb = cubie.CubieCube(sy.symCube[32].cp, sy.symCube[32].co, sy.symCube[32].ep, sy.symCube[32].eo)
+        fb.multiply(cc)
+        fb.multiply(sy.symCube[16])  # symCube[32]*cc*symCube[32]^-1
+        return cc, rl, fb
+
+    @staticmethod
+    def inverse_child(inv, m, togo):
+        """The inverse of a position has the same distance as the position. inv is the inverse of a node seen from the
+        UD, RL and FB axis (see inverse_views()), returns the same for its child after move m or None if the tables
+        show that the inverse needs togo or more moves. The inverse is not reached by a move from the inverse of the
+        node, (x * m)^-1 = m^-1 * x^-1, so the distances mod 3 can not be tracked and the depths are computed by walks
+        down the tables. The walks stop after togo moves. The views of the node are shared by all its children, each
+        view of a child is one multiplication with the conjugated inverse move. The corners of the inverse are not
+        checked, they have the same distance as the corners of the child."""
+        mi = m - m % 3 + 2 - m % 3  # the inverse move
+        if pr.edge_depth is not None:
+            ud = cubie.CubieCube(cubie.moveCube[mi].cp, cubie.moveCube[mi].co, cubie.moveCube[mi].ep,
+                                 cubie.moveCube[mi].eo)
+            ud.multiply(inv[0])
+            if pr.edge_depth[ud.get_edges6()] >= togo:
+                return None
+        child = []
+        dist = []
+        for k in range(3):
+            mk = sy.conj_move[N_MOVE * 16 * k + mi]  # the inverse move seen from the axis
+            cc = cubie.CubieCube(cubie.moveCube[mk].cp, cubie.moveCube[mk].co, cubie.moveCube[mk].ep,
+                                 cubie.moveCube[mk].eo)
+            cc.multiply(inv[k])
+            d = coord.phasex24x35_depth(cc.get_slice_sorted(), cc.get_flip(), cc.get_twist(), cc.get_udcorners(),
+                                        togo)
+            if d >= togo:
+                return None
+            child.append(cc)
+            dist.append(d)
+        if dist[0] != 0 and dist[0] == dist[1] and dist[1] == dist[2] and dist[0] + 1 >= togo:
+            return None
+        return tuple(child)
+
+    def search(self, UD_flip, RL_flip, FB_flip, UD_twist, RL_twist, FB_twist, UD_slice_sorted,
+               RL_slice_sorted, FB_slice_sorted, UDcorn, RLcorn, FBcorn, corners, edges6, UD_dist, RL_dist, FB_dist,
+               CT_dist, togo):
+        sofar = self.sofar
+
+        if self.solfound:
+            return
+        if togo == 0:
+            if corners == 0:
+                self.solfound = True
+            return
+
+        else:
+            todo = en.Move
+            if self.root_moves is not None and len(sofar) < 2:  # a symmetric cube, see find_root_moves()
+                todo = [en.Move(m) for m in (self.root_moves[0] if len(sofar) == 0 else
+                                             self.root_moves[1][sofar[-1]])]
+            for m in todo:
+
+                if len(sofar) > 0:
+                    diff = sofar[-1] // 3 - m // 3
+                    if diff in [0, 3]:  # successive moves on same face or on same axis with wrong order
+                        continue
+
+                self.nodecount += 1
+                if self.nodecount >= self.next_poll:
+                    self.poll()
+                    if self.aborted:
+                        return
+
+                corners1 = mv.corners_move[N_MOVE * corners + m]
+                co_dist1 = pr.corner_depth[corners1]
+                if co_dist1 >= togo:
                     continue
+                UD_twist1 = mv.twist_move[N_MOVE * UD_twist + m]
+                CT_dist1 = 0
+                if pr.cornertwist_depth3 is not None:  # corner permutation and twist together
+                    CT_dist1 = pr.distance[3 * CT_dist + pr.get_cornertwist_depth3(corners1, UD_twist1)]
+                    if CT_dist1 >= togo:
+                        continue
+                ########################################################################################################
+                UDcorn1 = mv.udcorners_move[N_MOVE * UDcorn + m]
+                UD_flip1 = mv.flip_move[N_MOVE * UD_flip + m]
+                UD_slice_sorted1 = mv.slice_sorted_move[N_MOVE * UD_slice_sorted + m]
+
+                fs = N_FLIP * UD_slice_sorted1 + UD_flip1  # raw new flip_slicesorted coordinate
+                # now representation as representant-symmetry pair
+                fs_classsym = sy.flipslicesorted_classsym[fs]
+                fs_idx = fs_classsym >> 4  # index of representant
+                fs_sym = fs_classsym & 15  # symmetry
+
+                UD_dist1_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(UDcorn1 << 4) + fs_sym],
+                                                    N_TWIST * fs_idx + sy.twist_conj[(UD_twist1 << 4) + fs_sym])
+                UD_dist1 = pr.distance[3 * UD_dist + UD_dist1_mod3]
+                if UD_dist1 >= togo:  # impossible to reach subgroup H in togo_phase1 - 1 moves
+                    continue
+                ########################################################################################################
+                mrl = sy.conj_move[N_MOVE * 16 + m]  # move viewed from 120° rotated position
+
+                RL_twist1 = mv.twist_move[N_MOVE * RL_twist + mrl]
+                RLcorn1 = mv.udcorners_move[N_MOVE * RLcorn + mrl]
+                RL_flip1 = mv.flip_move[N_MOVE * RL_flip + mrl]
+                RL_slice_sorted1 = mv.slice_sorted_move[N_MOVE * RL_slice_sorted + mrl]
+
+                fs = N_FLIP * RL_slice_sorted1 + RL_flip1
+                fs_classsym = sy.flipslicesorted_classsym[fs]
+                fs_idx = fs_classsym >> 4
+                fs_sym = fs_classsym & 15
+
+                RL_dist1_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(RLcorn1 << 4) + fs_sym],
+                                                    N_TWIST * fs_idx + sy.twist_conj[(RL_twist1 << 4) + fs_sym])
+                RL_dist1 = pr.distance[3 * RL_dist + RL_dist1_mod3]
+                if RL_dist1 >= togo:
+                    continue
+                ########################################################################################################
+                mfb = sy.conj_move[N_MOVE * 32 + m]  # move viewed from 240° rotated position
+
+                FB_twist1 = mv.twist_move[N_MOVE * FB_twist + mfb]
+                FBcorn1 = mv.udcorners_move[N_MOVE * FBcorn + mfb]
+                FB_flip1 = mv.flip_move[N_MOVE * FB_flip + mfb]
+                FB_slice_sorted1 = mv.slice_sorted_move[N_MOVE * FB_slice_sorted + mfb]
+
+                fs = N_FLIP * FB_slice_sorted1 + FB_flip1
+                fs_classsym = sy.flipslicesorted_classsym[fs]
+                fs_idx = fs_classsym >> 4
+                fs_sym = fs_classsym & 15
+
+                FB_dist1_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(FBcorn1 << 4) + fs_sym],
+                                                    N_TWIST * fs_idx + sy.twist_conj[(FB_twist1 << 4) + fs_sym])
+                FB_dist1 = pr.distance[3 * FB_dist + FB_dist1_mod3]
+                if FB_dist1 >= togo:
+                    continue
+                ########################################################################################################
+                if UD_dist1 != 0 and UD_dist1 == RL_dist1 and RL_dist1 == FB_dist1:
+                    if UD_dist1 + 1 >= togo:  # due to definition of coordinates
+                        continue
+                ########################################################################################################
+                edges61 = 0
+                if pr.edge_depth is not None:  # evaluated last, so a cut is a cut no other table gives
+                    edges61 = mv.edges6_move[N_MOVE * (edges6 >> 6) + m] ^ (edges6 & 63)
+                    self.edge_probes += 1
+                    if pr.edge_depth[edges61] >= togo:
+                        self.edge_cutoffs += 1
+                        continue
+                ########################################################################################################
+                if eg.starts is not None and togo <= defs.ENDGAME_DEPTH + 1:  # the exact distance of the new position
+                    st1 = (corners1, UD_twist1, UD_flip1, UD_slice_sorted1, RL_slice_sorted1, FB_slice_sorted1)
+                    if eg.get_depth(*st1) != togo - 1:  # no solution with togo - 1 moves
+                        continue
+                    tail = eg.solve_tail(st1, togo - 1, m)
+                    if tail is None:  # all solutions need moves in the wrong order
+                        continue
+                    sofar.append(m)
+                    sofar.extend(en.Move(m1) for m1 in tail)
+                    self.solfound = True
+                    return
+                ########################################################################################################
+                inv1 = None
+                if self.inv is not None and togo >= defs.INVERSE_MIN_TOGO:  # the inverse of the new position
+                    inv1 = self.inverse_child(self.inv[-1], m, togo)
+                    if inv1 is None:
+                        continue
+                    self.inv.append(inv1)
+
+                sofar.append(m)
+                self.search(UD_flip1, RL_flip1, FB_flip1, UD_twist1, RL_twist1, FB_twist1, UD_slice_sorted1,
+                            RL_slice_sorted1, FB_slice_sorted1, UDcorn1, RLcorn1, FBcorn1, corners1, edges61,
+                            UD_dist1, RL_dist1, FB_dist1, CT_dist1, togo - 1)
+                if self.solfound:
+                    return
+                sofar.pop(-1)
+                if inv1 is not None:
+                    self.inv.pop(-1)
+
+
+    def search_iter(self, UD_flip, RL_flip, FB_flip, UD_twist, RL_twist, FB_twist, UD_slice_sorted,
+                    RL_slice_sorted, FB_slice_sorted, UDcorn, RLcorn, FBcorn, corners, edges6, UD_dist, RL_dist,
+                    FB_dist, CT_dist, togo):
+        """Same search as search() with an explicit stack. The coordinates of ply p are kept in preallocated lists at
+        index p, the tables are bound to local names and the moves are plain ints. It generates the same nodes in the
+        same order as search()."""
+        if self.solfound:
+            return
+        if togo == 0:
+            if corners == 0:
+                self.solfound = True
+            return
+        twcorn_move = mv.twcorn_move
+        flip_move = mv.flip_move
+        slice_sorted_move = mv.slice_sorted_move
+        corners_move = mv.corners_move
+        corner_depth = pr.corner_depth
+        get_depth3 = pr.get_fsstc_depth3
+        distance = pr.distance
+        classsym = sy.flipslicesorted_classsym
+        twcorn_conj = sy.twcorn_conj
+        cornertwist = pr.cornertwist_depth3  # None without CORNER_TWIST_TABLE
+        corners_classsym = sy.corners_classsym
+        twist_conj = sy.twist_conj
+        edge_depth = pr.edge_depth  # None without EDGE_TABLE
+        edges6_move = mv.edges6_move
+        eg_togo = defs.ENDGAME_DEPTH + 1 if eg.starts is not None else 0  # tg of the nodes solved by the endgame tables
+        eg_depth = eg.get_depth
+        conj_rl = sy.conj_move[N_MOVE * 16:N_MOVE * 17]  # moves viewed from the 120° rotated position
+        conj_fb = sy.conj_move[N_MOVE * 32:N_MOVE * 33]  # moves viewed from the 240° rotated position
+        # succ[m] are the moves which may follow the move m, not on the same face or on the same axis in wrong order.
+        # succ[N_MOVE] are all moves, used at the root if there is no move before.
+        succ = [[m2 for m2 in range(N_MOVE) if m // 3 - m2 // 3 not in (0, 3)] for m in range(N_MOVE)] + \
+               [list(range(N_MOVE))]
+
+        n = togo + 1
+        ud_flip, rl_flip, fb_flip = [0] * n, [0] * n, [0] * n
+        ud_twcorn, rl_twcorn, fb_twcorn = [0] * n, [0] * n, [0] * n  # N_TWIST * udcorners + twist
+        ud_slice, rl_slice, fb_slice = [0] * n, [0] * n, [0] * n
+        corn = [0] * n
+        ud_dist, rl_dist, fb_dist = [0] * n, [0] * n, [0] * n
+        ct_dist = [0] * n
+        edg = [0] * n  # the edges6 coordinate
+        inv = [None] * n  # the inverse positions with INVERSE_PRUNING, see inverse_child()
+        moves = [0] * n  # moves[p] is the move which leads from ply p to ply p + 1
+        cand = [succ[N_MOVE]] * n  # cand[p] are the moves to try at ply p
+        next_move = [0] * n  # index of the next move in cand[p]
+
+        ud_flip[0], rl_flip[0], fb_flip[0] = UD_flip, RL_flip, FB_flip
+        ud_twcorn[0], rl_twcorn[0], fb_twcorn[0] = N_TWIST * UDcorn + UD_twist, N_TWIST * RLcorn + RL_twist, \
+            N_TWIST * FBcorn + FB_twist
+        ud_slice[0], rl_slice[0], fb_slice[0] = UD_slice_sorted, RL_slice_sorted, FB_slice_sorted
+        corn[0] = corners
+        ud_dist[0], rl_dist[0], fb_dist[0] = UD_dist, RL_dist, FB_dist
+        ct_dist[0] = CT_dist
+        edg[0] = edges6
+        inv[0] = self.inv[-1] if self.inv is not None else None
+        inv_togo = defs.INVERSE_MIN_TOGO if self.inv is not None else togo + 1
+        if len(self.sofar) > 0:
+            cand[0] = succ[self.sofar[-1]]  # the last move before the root
+        succs = [succ] * n  # succs[p][m] are the moves to try at ply p after the move m
+        if self.root_moves is not None and len(self.sofar) < 2:  # a symmetric cube, see find_root_moves()
+            if len(self.sofar) == 0:
+                cand[0] = self.root_moves[0]
+                succs[1] = self.root_moves[1]
+            else:
+                cand[0] = self.root_moves[1][self.sofar[-1]]
+        nodecount = self.nodecount
+        p = 0
+        while p >= 0:
+            i = next_move[p]
+            if i == len(cand[p]):
+                p -= 1  # all moves of this ply tried
+                continue
+            next_move[p] = i + 1
+            m = cand[p][i]
 
             nodecount += 1
+            if nodecount >= self.next_poll:
+                self.nodecount = nodecount
+                self.poll()
+                if self.aborted:
+                    return
+            tg = togo - p
 
-            corners1 = mv.corners_move[N_MOVE * corners + m]
-            co_dist1 = pr.corner_depth[corners1]
-            if co_dist1 >= togo:
+            corners1 = corners_move[N_MOVE * corn[p] + m]
+            if corner_depth[corners1] >= tg:
                 continue
-            ############################################################################################################
-            UD_twist1 = mv.twist_move[N_MOVE * UD_twist + m]
-            UDcorn1 = mv.udcorners_move[N_MOVE * UDcorn + m]
-            UD_flip1 = mv.flip_move[N_MOVE * UD_flip + m]
-            UD_slice_sorted1 = mv.slice_sorted_move[N_MOVE * UD_slice_sorted + m]
-
-            fs = N_FLIP * UD_slice_sorted1 + UD_flip1  # raw new flip_slicesorted coordinate
-            # now representation as representant-symmetry pair
-            fs_idx = sy.flipslicesorted_classidx[fs]  # index of representant
-            fs_sym = sy.flipslicesorted_sym[fs]  # symmetry
-
-            UD_dist1_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(UDcorn1 << 4) + fs_sym],
-                                                N_TWIST * fs_idx + sy.twist_conj[(UD_twist1 << 4) + fs_sym])
-            UD_dist1 = pr.distance[3 * UD_dist + UD_dist1_mod3]
-            if UD_dist1 >= togo:  # impossible to reach subgroup H in togo_phase1 - 1 moves
+
+            ud_twcorn1 = twcorn_move[N_MOVE * ud_twcorn[p] + m]
+            ct_dist1 = 0
+            if cornertwist is not None:
+                cs = corners_classsym[corners1]
+                ix = N_TWIST * (cs >> 4) + twist_conj[(ud_twcorn1 % N_TWIST << 4) + (cs & 15)]
+                ct_dist1 = distance[3 * ct_dist[p] + ((cornertwist[ix >> 4] >> ((ix & 15) << 1)) & 3)]
+                if ct_dist1 >= tg:
+                    continue
+            ud_flip1 = flip_move[N_MOVE * ud_flip[p] + m]
+            ud_slice1 = slice_sorted_move[N_MOVE * ud_slice[p] + m]
+            fs = classsym[N_FLIP * ud_slice1 + ud_flip1]  # (class index << 4) | symmetry
+            tc = twcorn_conj[(ud_twcorn1 << 4) + (fs & 15)]  # (udcorners << 12) | twist
+            ud_dist1 = distance[3 * ud_dist[p] + get_depth3(tc >> 12, N_TWIST * (fs >> 4) + (tc & 4095))]
+            if ud_dist1 >= tg:
                 continue
-            ############################################################################################################
-            mrl = sy.conj_move[N_MOVE * 16 + m]  # move viewed from 120° rotated position
-
-            RL_twist1 = mv.twist_move[N_MOVE * RL_twist + mrl]
-            RLcorn1 = mv.udcorners_move[N_MOVE * RLcorn + mrl]
-            RL_flip1 = mv.flip_move[N_MOVE * RL_flip + mrl]
-            RL_slice_sorted1 = mv.slice_sorted_move[N_MOVE * RL_slice_sorted + mrl]
-
-            fs = N_FLIP * RL_slice_sorted1 + RL_flip1
-            fs_idx = sy.flipslicesorted_classidx[fs]
-            fs_sym = sy.flipslicesorted_sym[fs]
-
-            RL_dist1_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(RLcorn1 << 4) + fs_sym],
-                                                N_TWIST * fs_idx + sy.twist_conj[(RL_twist1 << 4) + fs_sym])
-            RL_dist1 = pr.distance[3 * RL_dist + RL_dist1_mod3]
-            if RL_dist1 >= togo:
+
+            mrl = conj_rl[m]
+            rl_twcorn1 = twcorn_move[N_MOVE * rl_twcorn[p] + mrl]
+            rl_flip1 = flip_move[N_MOVE * rl_flip[p] + mrl]
+            rl_slice1 = slice_sorted_move[N_MOVE * rl_slice[p] + mrl]
+            fs = classsym[N_FLIP * rl_slice1 + rl_flip1]
+            tc = twcorn_conj[(rl_twcorn1 << 4) + (fs & 15)]
+            rl_dist1 = distance[3 * rl_dist[p] + get_depth3(tc >> 12, N_TWIST * (fs >> 4) + (tc & 4095))]
+            if rl_dist1 >= tg:
                 continue
-            ############################################################################################################
-            mfb = sy.conj_move[N_MOVE * 32 + m]  # move viewed from 240° rotated position
-
-            FB_twist1 = mv.twist_move[N_MOVE * FB_twist + mfb]
-            FBcorn1 = mv.udcorners_move[N_MOVE * FBcorn + mfb]
-            FB_flip1 = mv.flip_move[N_MOVE * FB_flip + mfb]
-            FB_slice_sorted1 = mv.slice_sorted_move[N_MOVE * FB_slice_sorted + mfb]
-
-            fs = N_FLIP * FB_slice_sorted1 + FB_flip1
-            fs_idx = sy.flipslicesorted_classidx[fs]
-            fs_sym = sy.flipslicesorted_sym[fs]
-
-            FB_dist1_mod3 = pr.get_fsstc_depth3(sy.udcorners_conj[(FBcorn1 << 4) + fs_sym],
-                                                N_TWIST * fs_idx + sy.twist_conj[(FB_twist1 << 4) + fs_sym])
-            FB_dist1 = pr.distance[3 * FB_dist + FB_dist1_mod3]
-            if FB_dist1 >= togo:
+
+            mfb = conj_fb[m]
+            fb_twcorn1 = twcorn_move[N_MOVE * fb_twcorn[p] + mfb]
+            fb_flip1 = flip_move[N_MOVE * fb_flip[p] + mfb]
+            fb_slice1 = slice_sorted_move[N_MOVE * fb_slice[p] + mfb]
+            fs = classsym[N_FLIP * fb_slice1 + fb_flip1]
+            tc = twcorn_conj[(fb_twcorn1 << 4) + (fs & 15)]
+            fb_dist1 = distance[3 * fb_dist[p] + get_depth3(tc >> 12, N_TWIST * (fs >> 4) + (tc & 4095))]
+            if fb_dist1 >= tg:
                 continue
-            ############################################################################################################
-            if UD_dist1 != 0 and UD_dist1 == RL_dist1 and RL_dist1 == FB_dist1:
-                if UD_dist1 + 1 >= togo:  # due to definition of coordinates
+
+            if ud_dist1 != 0 and ud_dist1 == rl_dist1 and rl_dist1 == fb_dist1 and ud_dist1 + 1 >= tg:
+                continue  # due to definition of coordinates
+
+            edges61 = 0
+            if edge_depth is not None:  # evaluated last, so a cut is a cut no other table gives
+                edges61 = edges6_move[N_MOVE * (edg[p] >> 6) + m] ^ (edg[p] & 63)
+                self.edge_probes += 1
+                if edge_depth[edges61] >= tg:
+                    self.edge_cutoffs += 1
                     continue
 
-            sofar.append(m)
-            search(UD_flip1, RL_flip1, FB_flip1, UD_twist1, RL_twist1, FB_twist1, UD_slice_sorted1,
-                   RL_slice_sorted1, FB_slice_sorted1, UDcorn1, RLcorn1, FBcorn1, corners1, UD_dist1, RL_dist1,
-                   FB_dist1, togo - 1)
-            if solfound:
+            if tg <= eg_togo:  # the exact distance of the new position
+                st1 = (corners1, ud_twcorn1 % N_TWIST, ud_flip1, ud_slice1, rl_slice1, fb_slice1)
+                if eg_depth(*st1) != tg - 1:  # no solution with tg - 1 moves
+                    continue
+                tail = eg.solve_tail(st1, tg - 1, m)
+                if tail is None:  # all solutions need moves in the wrong order
+                    continue
+                moves[p] = m
+                self.nodecount = nodecount
+                self.solfound = True
+                self.sofar.extend(en.Move(mm) for mm in moves[:p + 1] + tail)
                 return
-            sofar.pop(-1)
 
+            inv1 = None
+            if tg >= inv_togo:  # the inverse of the new position
+                inv1 = self.inverse_child(inv[p], m, tg)
+                if inv1 is None:
+                    continue
+
+            moves[p] = m
+            if tg == 1:  # the new node is a leaf
+                if corners1 == 0:
+                    self.nodecount = nodecount
+                    self.solfound = True
+                    self.sofar.extend(en.Move(moves[i]) for i in range(togo))
+                    return
+                continue
+            p += 1
+            ud_flip[p], rl_flip[p], fb_flip[p] = ud_flip1, rl_flip1, fb_flip1
+            ud_twcorn[p], rl_twcorn[p], fb_twcorn[p] = ud_twcorn1, rl_twcorn1, fb_twcorn1
+            ud_slice[p], rl_slice[p], fb_slice[p] = ud_slice1, rl_slice1, fb_slice1
+            corn[p] = corners1
+            ud_dist[p], rl_dist[p], fb_dist[p] = ud_dist1, rl_dist1, fb_dist1
+            ct_dist[p] = ct_dist1
+            edg[p] = edges61
+            inv[p] = inv1
+            cand[p] = succs[p][m]
+            next_move[p] = 0
+        self.nodecount = nodecount
+
+    def search_parallel(self, pool, args):
+        """Expand the first SPLIT_PLIES plies and let the pool search the subtrees. Without a solution all subtrees are
+        searched, so a depth is finished before the next depth starts and the solution stays optimal."""
+        split = SplitSolver(SPLIT_PLIES)
+        split.inv = None if self.inv is None else list(self.inv)
+        split.root_moves = self.root_moves
+        split.search(*args)
+        self.nodecount += split.nodecount
+        self.edge_probes += split.edge_probes
+        self.edge_cutoffs += split.edge_cutoffs
+        if split.solfound:  # solved by the endgame tables within the first plies
+            self.sofar = split.sofar
+            self.solfound = True
+            return
+        self.stop.clear()
+        results = pool.imap_unordered(search_subtree, split.tasks)
+        for k in range(len(split.tasks)):  # all results are collected, so no worker searches after this call
+            timeout = None if self.deadline is None or self.aborted else max(self.deadline - time.monotonic(), 0)
+            try:
+                sofar, nodecount, edge_probes, edge_cutoffs = results.next(timeout)
+            except mp.TimeoutError:
+                self.aborted = True
+                self.solfound = True
+                self.stop.set()  # the workers stop at their next poll and the remaining subtrees are skipped
+                sofar, nodecount, edge_probes, edge_cutoffs = results.next()
+            self.nodecount += nodecount
+            self.edge_probes += edge_probes
+            self.edge_cutoffs += edge_cutoffs
+            if sofar is not None and not self.solfound:  # the worker has set the event which stops the other workers
+                self.sofar = sofar
+                self.solfound = True
+
+    def solve(self, cubestring, workers=None, deadline=None, fallback=None):
+        """Solve a cube defined by its cube definition string.
+         :param cubestring: The format of the string is given in the Facelet class defined in the file enums.py
+         :param workers: Number of processes which search the tree, SOLVE_WORKERS in defs.py if None. The pool of the
+          processes is kept by the Solver for the next solves until close() is called. Not possible in a pool worker.
+         :param deadline: If not None the time.monotonic() value at which the search stops, for example
+          time.monotonic() + 2. The clock is checked every POLL_NODES nodes. Then a SolveTimeout is returned.
+         :param fallback: Function which is called with cubestring after a timeout, for example a fast non-optimal
+          solver. Its result is the solution of the SolveTimeout.
+        """
+        fc = face.FaceCube()
+        s = fc.from_string(cubestring)  # initialize fc
+        if s != cubie.CUBE_OK:
+            return s  # no valid cubestring, gives invalid facelet cube
+        cc = fc.to_cubie_cube()
+        s = cc.verify()
+        if s != cubie.CUBE_OK:
+            return s  # no valid facelet cube, gives invalid cubie cube
+
+        init()
+        coc = coord.CoordCube(cc)
+
+        togo = max(coc.UD_phasex24x35_depth, coc.RL_phasex24x35_depth, coc.FB_phasex24x35_depth,
+                   coc.cornertwist_depth, coc.edge_depth)  # lower bound for distance to solved
+        inv_root = None
+        if defs.INVERSE_PRUNING:  # the inverse cube has the same distance
+            inv_root = cubie.CubieCube()
+            cc.inv_cubie_cube(inv_root)
+            coi = coord.CoordCube(inv_root)
+            togo = max(togo, coi.UD_phasex24x35_depth, coi.RL_phasex24x35_depth, coi.FB_phasex24x35_depth,
+                       coi.cornertwist_depth, coi.edge_depth)
+        if eg.starts is not None:  # the exact distance or more than ENDGAME_DEPTH moves
+            d = eg.get_depth(coc.corners, coc.UD_twist, coc.UD_flip, coc.UD_slice_sorted, coc.RL_slice_sorted,
+                             coc.FB_slice_sorted)
+            togo = d if d >= 0 else max(togo, defs.ENDGAME_DEPTH + 1)
+        self.root_moves = self.find_root_moves(cc) if defs.ROOT_SYMMETRY else None
+        self.deadline = deadline
+        abort = self.abort
+        if deadline is not None:
+            self.abort = lambda: time.monotonic() >= deadline or (abort is not None and abort())
+        self.aborted = False
+        self.solfound = False
+        start_time = time.monotonic()
+        self.totnodes = 0
+        self.nodecount = 0
+        self.edge_probes = 0
+        self.edge_cutoffs = 0
+        self.depth_nodes = {}
+        self.depth_edges = {}
+        workers = defs.SOLVE_WORKERS if workers is None else workers
+        if workers > 1 and mp.current_process().daemon:
+            raise ValueError('workers > 1 is not possible in a pool worker, for example of solve_many')
+        pool = self.get_pool(workers) if workers > 1 else None
+        try:
+            while not self.solfound:
+                self.sofar = []
+                self.inv = None if inv_root is None else [self.inverse_views(inv_root)]
+                s_time = time.monotonic()
+                self.totnodes += self.nodecount
+                self.nodecount = 0
+                self.next_poll = POLL_NODES
+                probes, cutoffs = self.edge_probes, self.edge_cutoffs
+                args = (coc.UD_flip, coc.RL_flip, coc.FB_flip, coc.UD_twist, coc.RL_twist, coc.FB_twist,
+                        coc.UD_slice_sorted, coc.RL_slice_sorted, coc.FB_slice_sorted, coc.UD_corners, coc.RL_corners,
+                        coc.FB_corners, coc.corners, coc.edges6,
+                        coc.UD_phasex24x35_depth, coc.RL_phasex24x35_depth, coc.FB_phasex24x35_depth,
+                        coc.cornertwist_depth, togo)
+                if pool is not None and togo > SPLIT_PLIES:
+                    self.search_parallel(pool, args)
+                elif defs.SEARCH_KERNEL == 'iterative':
+                    self.search_iter(*args)
+                else:
+                    self.search(*args)
+                self.depth_nodes[togo] = self.nodecount
+                if pr.edge_depth is not None:
+                    self.depth_edges[togo] = (self.edge_probes - probes, self.edge_cutoffs - cutoffs)
+                if self.aborted:  # the deadline is reached before depth togo is searched completely
+                    break
+                if togo > 14:
+                    t = time.monotonic() - s_time + 0.0001
+                    print('depth ' + str(togo) + ' done in ' + str(round(t, 2)) + ' s, ' + str(
+                        self.nodecount) + ' nodes generated, ' + 'about ' + str(round(self.nodecount / t)) +
+                          ' nodes/s' + ('' if pr.edge_depth is None else ', edges6_prun: ' +
+                                        str(self.depth_edges[togo][1]) + ' cuts in ' +
+                                        str(self.depth_edges[togo][0]) + ' probes'))
+                togo += 1
+        except BaseException:
+            self.close()  # the workers may still search
+            raise
+        finally:
+            self.abort = abort
+        if pr.edge_depth is not None:
+            print('edges6_prun: ' + str(self.edge_cutoffs) + ' cuts in ' + str(self.edge_probes) + ' probes')
+        print('total time: ' + str(
+            round(time.monotonic() - start_time, 2)) + ' s, ' + 'nodes generated: ' + str(
+            self.totnodes + self.nodecount))
+        self.totnodes += self.nodecount
+        if self.aborted:
+            return SolveTimeout(togo, self.totnodes, None if fallback is None else fallback(cubestring))
 
-def solve(cubestring):
-    """Solve a cube defined by its cube definition string.
+        s = ''
+        for m in self.sofar:
+            s += m.name + ' '
+        return s + '(' + str(len(s) // 3) + 'f*)'
+
+
+class SplitSolver(Solver):
+    """Collects the subtrees below the first plies instead of searching them."""
+
+    def __init__(self, plies):
+        Solver.__init__(self)
+        self.plies = plies
+        self.tasks = []  # (moves to the root of the subtree, search arguments, inverse position or None)
+
+    def search(self, *args):
+        if len(self.sofar) == self.plies:
+            self.tasks.append((list(self.sofar), args, None if self.inv is None else self.inv[-1]))
+            return
+        Solver.search(self, *args)
+
+
+found = None  # event of the pool worker, set by the worker which finds a solution
+
+
+def init_worker(event):
+    global found
+    found = event
+
+
+def search_subtree(task):
+    """Search a subtree in a pool worker. Returns the solution or None, the number of generated nodes and the counters
+    of the edge pattern database."""
+    sofar, args, inv = task
+    if found.is_set():
+        return None, 0, 0, 0
+    s = Solver()
+    s.sofar = sofar
+    s.inv = None if inv is None else [inv]
+    s.abort = found.is_set
+    if defs.SEARCH_KERNEL == 'iterative':
+        s.search_iter(*args)
+    else:
+        s.search(*args)
+    if s.solfound and not s.aborted:
+        found.set()
+        return s.sofar, s.nodecount, s.edge_probes, s.edge_cutoffs
+    return None, s.nodecount, s.edge_probes, s.edge_cutoffs
+
+
+def solve(cubestring, workers=None, deadline=None, fallback=None):
+    """Solve a cube defined by its cube definition string with a new Solver.
      :param cubestring: The format of the string is given in the Facelet class defined in the file enums.py
+     :param workers: Number of processes which search the tree, SOLVE_WORKERS in defs.py if None. The pool of the
+      processes is forked for this cube only, use a Solver to keep it for several cubes.
+     :param deadline: If not None the time.monotonic() value at which the search stops and a SolveTimeout is returned
+     :param fallback: Function which gives the solution of the SolveTimeout from cubestring
     """
-    global sofar  # the moves of the potential solution maneuver
-    global solfound, nodecount
-    fc = face.FaceCube()
-    s = fc.from_string(cubestring)  # initialize fc
-    if s != cubie.CUBE_OK:
-        return s  # no valid cubestring, gives invalid facelet cube
-    cc = fc.to_cubie_cube()
-    s = cc.verify()
-    if s != cubie.CUBE_OK:
-        return s  # no valid facelet cube, gives invalid cubie cube
-
-    coc = coord.CoordCube(cc)
-
-    togo = max(coc.UD_phasex24x35_depth, coc.RL_phasex24x35_depth,
-               coc.FB_phasex24x35_depth)  # lower bound for distance to solved
-    solfound = False
-    start_time = time.monotonic()
-    totnodes = 0
-    nodecount = 0
-    while not solfound:
-        sofar = []
-        s_time = time.monotonic()
-        totnodes += nodecount
-        nodecount = 0
-        search(coc.UD_flip, coc.RL_flip, coc.FB_flip, coc.UD_twist, coc.RL_twist, coc.FB_twist,
-               coc.UD_slice_sorted, coc.RL_slice_sorted, coc.FB_slice_sorted, coc.UD_corners, coc.RL_corners,
-               coc.FB_corners, coc.corners,
-               coc.UD_phasex24x35_depth, coc.RL_phasex24x35_depth, coc.FB_phasex24x35_depth, togo)
-        if togo > 14:
-            t = time.monotonic() - s_time + 0.0001
-            print('depth ' + str(togo) + ' done in ' + str(round(t, 2)) + ' s, ' + str(
-                nodecount) + ' nodes generated, ' + 'about ' + str(round(nodecount / t)) + ' nodes/s')
-        togo += 1
-    print('total time: ' + str(
-        round(time.monotonic() - start_time, 2)) + ' s, ' + 'nodes generated: ' + str(
-        totnodes + nodecount))
-
-    s = ''
-    for m in sofar:
-        s += m.name + ' '
-    return s + '(' + str(len(s) // 3) + 'f*)'
+    solver = Solver()
+    try:
+        return solver.solve(cubestring, workers, deadline, fallback)
+    finally:
+        solver.close()
+
+
+def solve_one(task):
+    """Solve a cube of solve_many in a pool worker. Errors are returned as 'Error: ...' strings like invalid cubes."""
+    i, cubestring = task
+    try:
+        return i, Solver().solve(cubestring, 1)
+    except Exception as e:
+        return i, 'Error: ' + repr(e)
+
+
+def solve_many(cubestrings, workers=None, ordered=False):
+    """Solve many cubes with a process pool. The pool is forked after the tables are loaded, so all workers share the
+    pages of the tables. Yields (index, result) pairs, result is the solution or an error string.
+     :param cubestrings: An iterable of cube definition strings
+     :param workers: Number of processes, the number of CPUs if None. Values > 1 need fork (Linux, macOS).
+     :param ordered: If True the results are given in input order, else as soon as they are ready
+    """
+    workers = os.cpu_count() if workers is None else workers
+    init()
+    if workers <= 1:
+        for task in enumerate(cubestrings):
+            yield solve_one(task)
+        return
+    pool = mp.get_context('fork').Pool(workers)
+    try:
+        if ordered:
+            yield from pool.imap(solve_one, enumerate(cubestrings))
+        else:
+            yield from pool.imap_unordered(solve_one, enumerate(cubestrings))
+    finally:
+        pool.terminate()
 
 ########################################################################################################################
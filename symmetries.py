@@ -3,8 +3,10 @@
 from os import path
 import array as ar
 import cubie as cb
+import tables as tb
+import defs
 from defs import N_TWIST, N_SYM, N_SYM_D4h, N_FLIP, N_SLICE_SORTED, N_MOVE, N_FLIPSLICESORTED_CLASS, BIG_TABLE, \
-    N_UDCORNERS
+    N_UDCORNERS, N_CORNERS, N_CORNERS_CLASS
 from enums import Corner as Co, Edge as Ed, Move as Mv, BS
 
 INVALID = 65535
@@ -86,36 +88,6 @@ for s in range(N_SYM):
                 conj_move[N_MOVE * s + m] = m2
 ########################################################################################################################
 
-# ###### Generate the phase 1 table for the conjugation of the twist t by a symmetry s. twist_conj[t, s] = s*t*s^-1 ####
-fname = "conj_twist"
-if not path.isfile(fname):
-    print('On the first run, several tables will be created. This may take 8 hours using CPython '
-          '(depending on the hardware). ')
-    print('Using PyPy reduces the time to about 15 minutes.')
-    print('All tables are stored in ' + path.dirname(path.abspath(fname)))
-    print()
-    print("creating " + fname + " table...")
-    twist_conj = ar.array('H', [0] * (N_TWIST * N_SYM_D4h))
-    for t in range(N_TWIST):
-        cc = cb.CubieCube()
-        cc.set_twist(t)
-        for s in range(N_SYM_D4h):
-            ss = cb.CubieCube(symCube[s].cp, symCube[s].co, symCube[s].ep, symCube[s].eo)  # copy cube
-            ss.corner_multiply(cc)  # s*t
-            ss.corner_multiply(symCube[inv_idx[s]])  # s*t*s^-1
-            twist_conj[N_SYM_D4h * t + s] = ss.get_twist()
-    fh = open(fname, "wb")
-    twist_conj.tofile(fh)
-else:
-    print("loading " + fname + " table...")
-    fh = open(fname, 'rb')
-    twist_conj = ar.array('H')
-    twist_conj.fromfile(fh, N_TWIST * N_SYM_D4h)
-
-fh.close()
-# ######################################################################################################################
-
-
 # ###### Generate the table for the conjugation of the dcorners  t by a symmetry s. dcorners_conj[t, s] = s*t*s^-1 #####
 # fname = "conj_dcorners"
 # print("creating " + fname + " table...")
@@ -131,72 +103,158 @@ for t in range(N_UDCORNERS):
 # ######################################################################################################################
 
 
-# ############## Generate the tables to handle the symmetry reduced flip-slicesorted coordinate ########################
-if BIG_TABLE:  # load or generate only when BIG_TABLE is defined True
-    fname1 = "fs24_classidx"
-    fname2 = "fs24_sym"
-    fname3 = "fs24_rep"
-    if not (path.isfile(fname1) and path.isfile(fname2) and path.isfile(fname3)):
-        print("creating " + "flipslicesorted sym-tables...")
-        print("This may take about 15 minutes.")
-        flipslicesorted_classidx = ar.array('L', [INVALID32] * (N_FLIP * N_SLICE_SORTED))  # idx -> classidx
-        flipslicesorted_sym = ar.array('B', [0] * (N_FLIP * N_SLICE_SORTED))  # idx -> symmetry
-        flipslicesorted_rep = ar.array('L', [0] * N_FLIPSLICESORTED_CLASS)  # classidx -> idx of representant ANPASSEN
-
-        classidx = 0
-        cc = cb.CubieCube()
-        for slc in range(N_SLICE_SORTED):
-            cc.set_slice_sorted(slc)
-            for flip in range(N_FLIP):
-                cc.set_flip(flip)
-                idx = N_FLIP * slc + flip
-                if (idx + 1) % 40000 == 0:
-                    print('.', end='', flush=True)
-                if (idx + 1) % 3200000 == 0:
-                    print('')
-
-                if flipslicesorted_classidx[idx] == INVALID32:
-                    flipslicesorted_classidx[idx] = classidx
-                    flipslicesorted_sym[idx] = 0
-                    flipslicesorted_rep[classidx] = idx
-                else:
-                    continue
-                for s in range(N_SYM_D4h):  # conjugate representant by all 16 symmetries
-                    ss = cb.CubieCube(symCube[inv_idx[s]].cp, symCube[inv_idx[s]].co, symCube[inv_idx[s]].ep,
-                                      symCube[inv_idx[s]].eo)  # copy cube
-                    ss.edge_multiply(cc)
-                    ss.edge_multiply(symCube[s])  # s^-1*cc*s
-                    idx_new = N_FLIP * ss.get_slice_sorted() + ss.get_flip()
-                    if flipslicesorted_classidx[idx_new] == INVALID32:
-                        flipslicesorted_classidx[idx_new] = classidx
-                        flipslicesorted_sym[idx_new] = s
-                classidx += 1
-
-        print('')
-        fh = open(fname1, 'wb')
-        flipslicesorted_classidx.tofile(fh)
-        fh.close()
-        fh = open(fname2, 'wb')
-        flipslicesorted_sym.tofile(fh)
-        fh.close()
-        fh = open(fname3, 'wb')
-        flipslicesorted_rep.tofile(fh)
-        fh.close()
-
-    else:
-        print("loading " + "flipslicesorted sym-tables...")
-
-        fh = open(fname1, 'rb')
-        flipslicesorted_classidx = ar.array('L')
-        flipslicesorted_classidx.fromfile(fh, N_FLIP * N_SLICE_SORTED)
-        fh.close()
-        fh = open(fname2, 'rb')
-        flipslicesorted_sym = ar.array('B')
-        flipslicesorted_sym.fromfile(fh, N_FLIP * N_SLICE_SORTED)
-        fh.close()
-        fh = open(fname3, 'rb')
-        flipslicesorted_rep = ar.array('L')
-        flipslicesorted_rep.fromfile(fh, N_FLIPSLICESORTED_CLASS)
-        fh.close()
+twist_conj = None  # the conjugation table of the twist and the flipslicesorted sym-tables are filled by init()
+flipslicesorted_classidx = None  # only held while flipslicesorted_classsym is created
+flipslicesorted_sym = None
+flipslicesorted_classsym = None  # idx -> (classidx << 4) | symmetry, one lookup gives both
+flipslicesorted_rep = None
+twcorn_conj = None  # twcorn_conj[N_SYM_D4h * twcorn + s] = (udcorners_conj << 12) | twist_conj
+corners_classsym = None  # corners -> (classidx << 4) | symmetry, only with CORNER_TWIST_TABLE
+corners_rep = None
 
-########################################################################################################################
+
+def init():
+    """Load or create the conjugation table of the twist and the tables for the corners and flipslicesorted
+    classes."""
+    global twist_conj, flipslicesorted_classidx, flipslicesorted_sym, flipslicesorted_classsym, flipslicesorted_rep, \
+        twcorn_conj
+    if twcorn_conj is not None and (flipslicesorted_classsym is not None or not BIG_TABLE) and \
+            (corners_classsym is not None or not defs.CORNER_TWIST_TABLE):
+        return
+    # ###### Generate the phase 1 table for the conjugation of the twist t by a symmetry s. twist_conj[t, s] = s*t*s^-1
+    fname = "conj_twist"
+    twist_conj = tb.load(fname, 'H', N_TWIST * N_SYM_D4h)
+    if twist_conj is None:
+        print('On the first run, several tables will be created. This may take 8 hours using CPython '
+              '(depending on the hardware). ')
+        print('Using PyPy reduces the time to about 15 minutes.')
+        print('All tables are stored in ' + path.abspath(tb.table_path('')))
+        print()
+        print("creating " + fname + " table...")
+        twist_conj = ar.array('H', [0] * (N_TWIST * N_SYM_D4h))
+        for t in range(N_TWIST):
+            cc = cb.CubieCube()
+            cc.set_twist(t)
+            for s in range(N_SYM_D4h):
+                ss = cb.CubieCube(symCube[s].cp, symCube[s].co, symCube[s].ep, symCube[s].eo)  # copy cube
+                ss.corner_multiply(cc)  # s*t
+                ss.corner_multiply(symCube[inv_idx[s]])  # s*t*s^-1
+                twist_conj[N_SYM_D4h * t + s] = ss.get_twist()
+        tb.save(fname, twist_conj)
+    # ##################################################################################################################
+
+    # ############## Joint conjugation table for twcorn = N_TWIST * udcorners + twist by a symmetry s ##################
+    # The entry has the conjugated udcorners, the slice of the pruning table, in the upper bits and the conjugated twist
+    # in the lower 12 bits, so one lookup gives the table slice and the offset.
+    fname = "conj_twcorn"
+    twcorn_conj = tb.load(fname, 'I', N_TWIST * N_UDCORNERS * N_SYM_D4h)
+    if twcorn_conj is None:
+        print("creating " + fname + " table...")
+        twcorn_conj = ar.array('I')
+        for c in range(N_UDCORNERS):
+            c_conj = [udcorners_conj[N_SYM_D4h * c + s] << 12 for s in range(N_SYM_D4h)]
+            for t in range(N_TWIST):
+                twcorn_conj.extend(c_conj[s] | twist_conj[N_SYM_D4h * t + s] for s in range(N_SYM_D4h))
+        tb.save(fname, twcorn_conj)
+    # ##################################################################################################################
+
+    if defs.CORNER_TWIST_TABLE:
+        init_corners_classes()
+
+    # ############## Generate the tables to handle the symmetry reduced flip-slicesorted coordinate ####################
+    if BIG_TABLE:  # load or generate only when BIG_TABLE is defined True
+        fname1 = "fs24_classidx"
+        fname2 = "fs24_sym"
+        fname3 = "fs24_rep"
+        fname4 = "fs24_classsym"
+        flipslicesorted_rep = tb.load(fname3, 'L', N_FLIPSLICESORTED_CLASS)  # classidx -> idx of representant
+        flipslicesorted_classsym = tb.load(fname4, 'I', N_FLIP * N_SLICE_SORTED)
+        if flipslicesorted_classsym is not None and flipslicesorted_rep is not None:
+            return
+        flipslicesorted_classidx = tb.load(fname1, 'L', N_FLIP * N_SLICE_SORTED)  # idx -> classidx
+        flipslicesorted_sym = tb.load(fname2, 'B', N_FLIP * N_SLICE_SORTED)  # idx -> symmetry
+        if flipslicesorted_classidx is None or flipslicesorted_sym is None or flipslicesorted_rep is None:
+            print("creating " + "flipslicesorted sym-tables...")
+            print("This may take about 15 minutes.")
+            flipslicesorted_classidx = ar.array('L', [INVALID32] * (N_FLIP * N_SLICE_SORTED))  # idx -> classidx
+            flipslicesorted_sym = ar.array('B', [0] * (N_FLIP * N_SLICE_SORTED))  # idx -> symmetry
+            # classidx -> idx of representant ANPASSEN
+            flipslicesorted_rep = ar.array('L', [0] * N_FLIPSLICESORTED_CLASS)
+
+            classidx = 0
+            cc = cb.CubieCube()
+            for slc in range(N_SLICE_SORTED):
+                cc.set_slice_sorted(slc)
+                for flip in range(N_FLIP):
+                    cc.set_flip(flip)
+                    idx = N_FLIP * slc + flip
+                    if (idx + 1) % 40000 == 0:
+                        print('.', end='', flush=True)
+                    if (idx + 1) % 3200000 == 0:
+                        print('')
+
+                    if flipslicesorted_classidx[idx] == INVALID32:
+                        flipslicesorted_classidx[idx] = classidx
+                        flipslicesorted_sym[idx] = 0
+                        flipslicesorted_rep[classidx] = idx
+                    else:
+                        continue
+                    for s in range(N_SYM_D4h):  # conjugate representant by all 16 symmetries
+                        ss = cb.CubieCube(symCube[inv_idx[s]].cp, symCube[inv_idx[s]].co, symCube[inv_idx[s]].ep,
+                                          symCube[inv_idx[s]].eo)  # copy cube
+                        ss.edge_multiply(cc)
+                        ss.edge_multiply(symCube[s])  # s^-1*cc*s
+                        idx_new = N_FLIP * ss.get_slice_sorted() + ss.get_flip()
+                        if flipslicesorted_classidx[idx_new] == INVALID32:
+                            flipslicesorted_classidx[idx_new] = classidx
+                            flipslicesorted_sym[idx_new] = s
+                    classidx += 1
+
+            print('')
+            tb.save(fname1, flipslicesorted_classidx)
+            tb.save(fname2, flipslicesorted_sym)
+            tb.save(fname3, flipslicesorted_rep)
+
+        # The class index needs 21 bits and the symmetry 4 bits, so both fit into one 32 bit entry
+        print("creating " + fname4 + " table...")
+        flipslicesorted_classsym = ar.array('I', [0] * (N_FLIP * N_SLICE_SORTED))
+        for idx in range(N_FLIP * N_SLICE_SORTED):
+            flipslicesorted_classsym[idx] = (flipslicesorted_classidx[idx] << 4) | flipslicesorted_sym[idx]
+        tb.save(fname4, flipslicesorted_classsym)
+        flipslicesorted_classidx = None  # not needed any more
+        flipslicesorted_sym = None
+
+    ####################################################################################################################
+
+
+def init_corners_classes():
+    """Load or create the tables for the symmetry reduced corners coordinate, used by the cornertwist pruning table."""
+    global corners_classsym, corners_rep
+    fname1 = "co_classsym"
+    fname2 = "co_rep"
+    corners_classsym = tb.load(fname1, 'H', N_CORNERS)  # corners -> (classidx << 4) | symmetry
+    corners_rep = tb.load(fname2, 'H', N_CORNERS_CLASS)  # classidx -> corners of representant
+    if corners_classsym is not None and corners_rep is not None:
+        return
+    print("creating " + "corners sym-tables...")
+    corners_classsym = ar.array('H', [INVALID] * N_CORNERS)
+    corners_rep = ar.array('H', [0] * N_CORNERS_CLASS)
+    classidx = 0
+    cc = cb.CubieCube()
+    for corners in range(N_CORNERS):
+        if corners_classsym[corners] != INVALID:
+            continue
+        corners_classsym[corners] = classidx << 4
+        corners_rep[classidx] = corners
+        cc.set_corners(corners)
+        for s in range(N_SYM_D4h):  # conjugate representant by all 16 symmetries
+            ss = cb.CubieCube(symCube[inv_idx[s]].cp, symCube[inv_idx[s]].co, symCube[inv_idx[s]].ep,
+                              symCube[inv_idx[s]].eo)  # copy cube
+            ss.corner_multiply(cc)
+            ss.corner_multiply(symCube[s])  # s^-1*cc*s
+            corners_new = ss.get_corners()
+            if corners_classsym[corners_new] == INVALID:
+                corners_classsym[corners_new] = (classidx << 4) | s
+        classidx += 1
+    tb.save(fname1, corners_classsym)
+    tb.save(fname2, corners_rep)
@@ -0,0 +1,176 @@
+# ################## Storage of the tables: single table files or one table bundle with all tables #####################
+
+# A table bundle is a single file with all tables. It starts with a header (magic, format version, number of sections,
+# checksum of the section table), followed by the section table with one entry per table (name, array typecode, item
+# size, number of items, offset, length and CRC32 of the data) and the data of the sections, each aligned to 4096 bytes.
+# The bundle is opened with one open and mapped read-only, the tables are memoryviews of the mapping.
+#
+# python tables.py pack [bundle]    packs the single table files of the table directory into a bundle
+# python tables.py verify [bundle]  checks the header and the checksums of all sections of a bundle
+
+from os import path
+import os
+import sys
+import array as ar
+import mmap
+import struct
+import zlib
+import defs
+
+MAGIC = b'BIGOPTTB'
+VERSION = 1
+ALIGN = 4096
+HEADER = struct.Struct('<8sIII')  # magic, version, number of sections, CRC32 of the section table
+ENTRY = struct.Struct('<32scB2xQQQI4x')  # name, typecode, itemsize, count, offset, length, CRC32
+CHUNK = 1 << 24  # bytes per read when the data are streamed
+
+# The tables which can be stored in a bundle and the typecodes of their arrays
+TABLES = [('move_twist', 'H'), ('move_flip', 'H'), ('move_slice_sorted', 'H'), ('move_corners', 'H'),
+          ('move_twcorn', 'I'), ('conj_twist', 'H'), ('conj_twcorn', 'I'), ('fs24_classidx', 'L'), ('fs24_sym', 'B'),
+          ('fs24_rep', 'L'), ('fs24_classsym', 'I'), ('cornerprun', 'b'), ('co_classsym', 'H'), ('co_rep', 'H'),
+          ('cornertwist_prun', 'I'), ('move_edges6', 'I'), ('edges6_prun', 'B')] \
+         + [('phase1x24x35_prun' + str(i), 'L') for i in range(defs.N_UDCORNERS)] \
+         + [('phase1x24x35_prun3_' + str(i), 'B') for i in range(defs.N_UDCORNERS)] \
+         + [('phase1x35x24_prun', 'L')] \
+         + [('endgame' + str(defs.ENDGAME_DEPTH) + name, t) for name, t in (('_starts', 'I'), ('_keys', 'Q'),
+                                                                             ('_dists', 'B'))]
+
+bundle = None  # the Bundle in the table directory, False if there is none
+
+
+def table_path(fname):
+    """Path of the table file fname in the table directory."""
+    return path.join(defs.TABLE_DIR, fname)
+
+
+class Bundle:
+    """A table bundle mapped read-only into memory."""
+
+    def __init__(self, fname):
+        self.fname = fname
+        fh = open(fname, 'rb')
+        self.mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        fh.close()
+        if len(self.mm) < HEADER.size:
+            raise ValueError(fname + ' is not a table bundle')
+        magic, version, n, crc = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(fname + ' is not a table bundle')
+        if version != VERSION:
+            raise ValueError(fname + ' has format version ' + str(version) + ', expected ' + str(VERSION))
+        if zlib.crc32(self.mm[HEADER.size:HEADER.size + n * ENTRY.size]) != crc:
+            raise ValueError('section table of ' + fname + ' is corrupt')
+        self.sections = {}  # name -> (typecode, count, offset, length, crc)
+        for i in range(n):
+            name, typecode, itemsize, count, offset, length, crc = ENTRY.unpack_from(self.mm,
+                                                                                    HEADER.size + i * ENTRY.size)
+            name = name.rstrip(b'\0').decode()
+            typecode = typecode.decode()
+            if itemsize != ar.array(typecode).itemsize:
+                raise ValueError(fname + ' was created on a platform with another item size for ' + name)
+            if length != count * itemsize or offset + length > len(self.mm):
+                raise ValueError('section ' + name + ' of ' + fname + ' is truncated')
+            self.sections[name] = (typecode, count, offset, length, crc)
+
+    def section(self, name):
+        """The table name as memoryview of the mapping or None if the bundle does not contain it."""
+        if name not in self.sections:
+            return None
+        typecode, count, offset, length, crc = self.sections[name]
+        return memoryview(self.mm)[offset:offset + length].cast(typecode)
+
+    def verify(self):
+        """Stream the data of all sections and compare their checksums. Returns True if all sections are ok."""
+        ok = True
+        buf = memoryview(self.mm)
+        for name in self.sections:
+            typecode, count, offset, length, crc = self.sections[name]
+            c = 0
+            for i in range(offset, offset + length, CHUNK):
+                c = zlib.crc32(buf[i:min(i + CHUNK, offset + length)], c)
+            print(name + ': ' + ('ok' if c == crc else 'CHECKSUM ERROR'))
+            ok = ok and c == crc
+        return ok
+
+
+def pack_bundle(fname):
+    """Pack all single table files of the table directory into the bundle fname."""
+    entries = []
+    offset = (HEADER.size + len(TABLES) * ENTRY.size + ALIGN - 1) // ALIGN * ALIGN
+    for name, typecode in TABLES:
+        if path.isfile(table_path(name)):
+            length = path.getsize(table_path(name))
+            entries.append([name, typecode, length // ar.array(typecode).itemsize, offset, length, 0])
+            offset += (length + ALIGN - 1) // ALIGN * ALIGN
+
+    fh = open(fname + '.tmp', 'wb')
+    for e in entries:
+        print('packing ' + e[0] + '...')
+        fh.seek(e[3])
+        src = open(table_path(e[0]), 'rb')
+        data = src.read(CHUNK)
+        while data:
+            e[5] = zlib.crc32(data, e[5])
+            fh.write(data)
+            data = src.read(CHUNK)
+        src.close()
+    fh.truncate(offset)
+    table = b''.join(ENTRY.pack(name.encode(), typecode.encode(), ar.array(typecode).itemsize, count, off, length, crc)
+                     for name, typecode, count, off, length, crc in entries)
+    fh.seek(0)
+    fh.write(HEADER.pack(MAGIC, VERSION, len(entries), zlib.crc32(table)))
+    fh.write(table)
+    fh.close()
+    os.replace(fname + '.tmp', fname)
+
+
+def section(name):
+    """The table name from the bundle in the table directory or None if there is no bundle or it lacks the table."""
+    global bundle
+    if bundle is None:
+        bundle = False
+        if path.isfile(table_path(defs.TABLE_BUNDLE)):
+            print("opening table bundle " + table_path(defs.TABLE_BUNDLE) + "...")
+            bundle = Bundle(table_path(defs.TABLE_BUNDLE))
+    if bundle is False:
+        return None
+    return bundle.section(name)
+
+
+def load(fname, typecode, n):
+    """Get the table fname with n items from the bundle or from its table file. Returns None if the table does not
+    exist yet."""
+    t = section(fname)
+    if t is not None:
+        if len(t) != n:
+            raise ValueError('table ' + fname + ' in the bundle has ' + str(len(t)) + ' items instead of ' + str(n))
+        return t
+    if not path.isfile(table_path(fname)):
+        return None
+    print("loading " + fname + " table...")
+    t = ar.array(typecode)
+    if path.getsize(table_path(fname)) != n * t.itemsize:
+        raise ValueError('table file ' + table_path(fname) + ' does not have ' + str(n * t.itemsize) +
+                         ' bytes. Delete it to create it again.')
+    fh = open(table_path(fname), 'rb')
+    t.fromfile(fh, n)
+    fh.close()
+    return t
+
+
+def save(fname, t):
+    """Write the table t to its table file."""
+    fh = open(table_path(fname), 'wb')
+    t.tofile(fh)
+    fh.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] not in ('pack', 'verify'):
+        print('usage: python tables.py pack|verify [bundle]')
+        sys.exit(2)
+    bfile = sys.argv[2] if len(sys.argv) > 2 else table_path(defs.TABLE_BUNDLE)
+    if sys.argv[1] == 'pack':
+        pack_bundle(bfile)
+    elif not Bundle(bfile).verify():
+        sys.exit(1)
@@ -0,0 +1,177 @@
+# ################ Table server: one copy of all tables in shared memory for all solver processes of a host ###########
+
+# python tableserver.py [name]  loads all tables, copies them into shared memory segments and keeps them until it is
+# terminated. Solver processes with TABLE_SHM = name in defs.py (or the environment variable BIGOPT_TABLE_SHM) attach
+# to the segments instead of loading the tables, so N solver processes need the memory of the tables only once.
+#
+# The segment <name> holds a JSON manifest with one entry per table: tier, module attribute, slice index (-1 if the
+# table is not a slice of the big pruning table), typecode and number of bytes. The table k is in segment <name>_<k>.
+# The manifest also holds the served tiers and the settings of defs.py the tables depend on, a client with other
+# settings can not use the tables and gets a ValueError.
+
+import sys
+import os
+import json
+import signal
+import time
+import atexit
+from multiprocessing import shared_memory, resource_tracker
+import defs
+import moves as mv
+import symmetries as sy
+import pruning as pr
+import endgame as eg
+
+# tier -> module and attributes with the tables of this tier
+SHARED = {'moves': (mv, ['twist_move', 'flip_move', 'slice_sorted_move', 'corners_move', 'udcorners_move',
+                     'twcorn_move', 'edges6_move']),
+          'sym': (sy, ['twist_conj', 'twcorn_conj', 'flipslicesorted_classsym', 'flipslicesorted_rep',
+                       'corners_classsym', 'corners_rep']),
+          'corner': (pr, ['corner_depth']),
+          'cornertwist': (pr, ['cornertwist_depth3']),
+          'edges': (pr, ['edge_depth']),
+          'endgame': (eg, ['starts', 'keys', 'dists']),
+          'big': (pr, ['fsstc_depth3', 'fsstc_depth3_inner'])}
+
+# tier -> the settings of defs.py which decide which tables the tier has and their format
+CONFIG = {'moves': ['EDGE_TABLE'], 'sym': ['BIG_TABLE', 'CORNER_TWIST_TABLE'], 'corner': [],
+          'cornertwist': ['CORNER_TWIST_TABLE'], 'edges': ['EDGE_TABLE'], 'endgame': ['ENDGAME_DEPTH'],
+          'big': ['BIG_TABLE', 'PRUN_LAYOUT', 'PRUN_BASE3']}
+
+segments = []  # the SharedMemory objects, they must live as long as the tables are used
+manifest = None  # the manifest of the table server the client attached to
+registered = False  # release() is registered to run at exit
+
+
+def release():
+    """Drop the tables in the segments and close the segments. Runs at exit, closing a segment fails as long as a
+    table of it is still referenced."""
+    for module, attrs in SHARED.values():
+        for attr in attrs:
+            if attr == 'fsstc_depth3':
+                for i in range(defs.N_UDCORNERS):
+                    if isinstance(pr.fsstc_depth3[i], memoryview):
+                        pr.fsstc_depth3[i] = None
+            elif isinstance(getattr(module, attr), memoryview):
+                setattr(module, attr, None)
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+
+def register_release():
+    """Run release() at exit, only in processes which use segments."""
+    global registered
+    if not registered:
+        atexit.register(release)
+        registered = True
+
+
+def share_tier(name, tier, entries):
+    """Copy the loaded tables of a tier into new shared memory segments and use these instead of the private copies.
+    The manifest entries of the tables are appended to entries."""
+    module, attrs = SHARED[tier]
+    for attr in attrs:
+        if attr == 'fsstc_depth3':
+            if defs.PRUN_BACKEND == 'cache':
+                raise ValueError("the tables of the 'cache' backend can not be shared, use 'array' or 'mmap'")
+            tables = [(i, pr.fsstc_depth3[i]) for i in range(defs.N_UDCORNERS)]
+        else:
+            tables = [(-1, getattr(module, attr))]
+        for idx, t in tables:
+            if t is None:  # for example the flipslicesorted tables with BIG_TABLE = False
+                continue
+            src = memoryview(t)
+            if src.nbytes == 0:  # the slices are released with PRUN_LAYOUT = 'inner'
+                continue
+            typecode = src.format
+            print('sharing ' + attr + ('' if idx < 0 else str(idx)) + ' table...')
+            shm = shared_memory.SharedMemory(name + '_' + str(len(entries)), create=True, size=max(src.nbytes, 1))
+            shm.buf[:src.nbytes] = src.cast('B')
+            segments.append(shm)
+            view = shm.buf[:src.nbytes].cast(typecode)
+            if idx < 0:
+                setattr(module, attr, view)
+            else:
+                pr.fsstc_depth3[idx] = view  # release the private copy slice by slice
+            entries.append([tier, attr, idx, typecode, src.nbytes])
+
+
+def serve(name):
+    """Load all tables, put them into shared memory and wait until the process is terminated."""
+    import solver as sv  # not nice here but else we have circular imports
+    defs.TABLE_SHM = None
+    register_release()
+    entries = []
+    try:
+        for tier in sv.TIERS:
+            sv.load_tier(tier)
+            share_tier(name, tier, entries)
+        config = {key: getattr(defs, key) for keys in CONFIG.values() for key in keys}
+        data = json.dumps({'tables': entries, 'tiers': list(sv.TIERS), 'config': config}).encode()
+        shm = shared_memory.SharedMemory(name, create=True, size=len(data))
+        shm.buf[:len(data)] = data
+        segments.append(shm)
+        print('table server ' + name + ' is ready, ' + str(sum(e[4] for e in entries) >> 20) + ' MB in ' +
+              str(len(entries)) + ' segments')
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for shm in segments:
+            shm.unlink()
+        print('table server ' + name + ' stopped')
+
+
+def attach_segment(segname):
+    """Attach to an existing segment. The segment is not unlinked when this process exits."""
+    try:
+        shm = shared_memory.SharedMemory(segname)
+    except FileNotFoundError:
+        raise ValueError('no table server segment ' + segname + ', start python tableserver.py first')
+    if os.name == 'posix':  # the resource tracker would unlink the segment when the client exits
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    segments.append(shm)
+    return shm
+
+
+def attach_tier(name, tier):
+    """Use the tables of a tier from the segments of the table server name. Raises a ValueError if the server does not
+    serve the tier or if it was started with other settings for the tables of the tier."""
+    global manifest
+    if manifest is None:
+        register_release()
+        shm = attach_segment(name)
+        manifest = json.loads(bytes(shm.buf).rstrip(b'\0'))
+    if 'tiers' not in manifest or 'config' not in manifest:
+        raise ValueError('table server ' + name + ' has no tiers and settings in its manifest, restart it')
+    if tier not in manifest['tiers']:
+        raise ValueError('table server ' + name + " does not serve the tier '" + tier + "'")
+    config = manifest['config']
+    for key in CONFIG[tier]:
+        if key not in config:
+            raise ValueError('table server ' + name + ' has no setting ' + key + ', restart it')
+        if config[key] != getattr(defs, key):
+            raise ValueError('table server ' + name + ' has ' + key + ' = ' + repr(config[key]) + ' but defs.py has '
+                             + repr(getattr(defs, key)))
+    module = SHARED[tier][0]
+    for k, (t, attr, idx, typecode, nbytes) in enumerate(manifest['tables']):
+        if t != tier:
+            continue
+        view = attach_segment(name + '_' + str(k)).buf[:nbytes].cast(typecode)
+        if idx < 0:
+            setattr(module, attr, view)
+            if attr == 'fsstc_depth3_inner':
+                pr.get_fsstc_depth3 = pr.get_fsstc_depth3_inner
+        else:
+            pr.fsstc_depth3[idx] = view
+            if typecode == 'B':
+                pr.get_fsstc_depth3 = pr.get_fsstc_depth3_base3
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1] if len(sys.argv) > 1 else 'bigopt')
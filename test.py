@@ -4,6 +4,21 @@ from cubie import CubieCube
 from enums import Move as m
 
 
+# ########## Each module can be imported on its own, the tables are not loaded at import ##############################
+import subprocess
+import sys
+
+for module in ('cubie', 'face', 'coord', 'moves', 'symmetries', 'pruning', 'endgame', 'tables', 'tableserver',
+               'solver', 'solcache', 'performance'):
+    check = ('import sys, ' + module + '\n'
+             'mv, sy, pr = (sys.modules.get(n) for n in ("moves", "symmetries", "pruning"))\n'
+             'assert mv is None or mv.twist_move is None, "move tables loaded"\n'
+             'assert sy is None or sy.twist_conj is None, "symmetry tables loaded"\n'
+             'assert pr is None or pr.corner_depth is None, "pruning tables loaded"\n')
+    r = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True)
+    if r.returncode != 0:
+        print('import ' + module + ' failed: ' + r.stderr.strip().splitlines()[-1])
+
 cbc = CubieCube()
 cbc.move(m.U3)
 fc = cbc.to_facelet_cube()
@@ -11,3 +26,31 @@ s = fc.to_string()
 print(s)
 s = solver.solve(s)
 print(s)
+
+# ########## The solution cache gives the 48 conjugates of a cube and of its inverse maneuvers of the same length ########
+import random
+import solcache
+import symmetries as sy
+
+cache = solcache.SolutionCache()
+for i in range(3):
+    cbc = CubieCube()
+    for k in range(8):
+        cbc.move(random.choice(list(m)))
+    cbi = CubieCube()
+    cbc.inv_cubie_cube(cbi)
+    length = None
+    for c0 in (cbc, cbi):
+        for s in range(48):
+            cc = CubieCube(sy.symCube[s].cp, sy.symCube[s].co, sy.symCube[s].ep, sy.symCube[s].eo)
+            cc.multiply(c0)
+            cc.multiply(sy.symCube[sy.inv_idx[s]])  # s * c0 * s^-1
+            sol = cache.solve(cc.to_facelet_cube().to_string())
+            moves = sol[:sol.rindex('(')].split()
+            if length is None:
+                length = len(moves)
+            for mv in moves:
+                cc.move(m[mv])
+            if cc != CubieCube() or len(moves) != length:
+                print('solution cache error for symmetry ' + str(s) + ': ' + sol)
+    print(str(i + 1) + '. cube: 96 related cubes solved with ' + str(length) + ' moves, cache ' + str(cache.stats()))